@@ -1,111 +1,384 @@
 import os
+import hmac
 import json
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+import time
+import asyncio
+from typing import Literal
+from email.utils import formatdate
+from functools import partial
+from urllib.parse import quote
+from contextlib import asynccontextmanager, aclosing
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from myagents.atlasfx_agent import run_agent as run_atlasfx
-from myagents.cryptonova_agent import run_agent as run_cryptonova
-from myagents.janemacro_agent import run_agent as run_janemacro
-from myagents.maxmentor_agent import run_agent as run_maxmentor
-from myagents.quantedge_agent import run_agent as run_quantedge
-from myagents.fx_graphs import plot_fx_setup
+from myagents.atlasfx_agent import run_agent as run_atlasfx, run_direct as direct_atlasfx, stream_agent as stream_atlasfx
+from myagents.cryptonova_agent import run_agent as run_cryptonova, run_direct as direct_cryptonova, stream_agent as stream_cryptonova
+from myagents.janemacro_agent import run_agent as run_janemacro, run_direct as direct_janemacro, stream_agent as stream_janemacro
+from myagents.maxmentor_agent import run_agent as run_maxmentor, run_direct as direct_maxmentor, stream_agent as stream_maxmentor
+from myagents.quantedge_agent import run_agent as run_quantedge, run_direct as direct_quantedge, stream_agent as stream_quantedge
+from myagents.chart_service import shutdown_pool
+from myagents.agent_output import parse_agent_output
+from myagents.chart_store import chart_store, CHARTS_DIR
+from myagents.lazy_charts import get_chart_png, is_chart_key, cache_stats as chart_cache_stats
+from myagents.clients import close_clients
+from myagents.orchestrator import run_agents_concurrently, stream_agents_concurrently
+from myagents.pipeline import time_saved
+from myagents.quote_cache import quote_cache
+from myagents.response_cache import response_cache, normalize_prompt
+from myagents.source_health import source_registry
+from myagents import metrics
+from myagents.snapshots import latest_snapshot
+from myagents.profiler import ProfileMiddleware, list_profiles, profile_path
+from db.batch_writer import chat_log_writer, log_chat
+from db.quote_store import quote_writer
+from db.chat_history import get_chat_logs
+from db.mydatabase import create_tables, ensure_default_user
+
+# === App lifecycle: tables and the System user on startup; chart GC and the DB
+# writers while running; drain the writers and release the chart pool and the
+# shared clients on shutdown ===
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await create_tables()
+        await ensure_default_user()
+    except Exception as e:
+        print(f"⚠️ Warning: could not prepare the database, chat logs and quotes may not be saved: {e}")
+    gc_task = asyncio.create_task(chart_store.run_gc())      # chart retention runs in the background
+    chat_log_writer.start()
+    quote_writer.start()
+    yield
+    gc_task.cancel()
+    await chat_log_writer.stop()
+    await quote_writer.stop()
+    await close_clients()
+    shutdown_pool()
 
 # === FastAPI app ===
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ProfileMiddleware)      # opt-in per-request profiles (X-Profile header / PROFILE_SAMPLE_RATE)
 
-CHARTS_DIR = os.path.join(os.path.dirname(__file__), "myagents", "charts")
-os.makedirs(CHARTS_DIR, exist_ok=True)
+# === Charts ===
+# Agent responses link charts as /charts/<key>.png, where <key> is a hash of the
+# chart inputs. A chart is rendered only when that URL is first fetched, then
+# served from an in-memory LRU. Since the key pins the content, responses carry
+# a strong ETag and are cacheable forever by browsers and CDNs.
+# Other files saved in CHARTS_DIR (myagents/charts/), e.g. by AtlasFX's
+# generate_fx_charts tool, are still served by name from the same path:
+# http://<your-server>/charts/EURUSD_AtlasFX.png
+IMMUTABLE = "public, max-age=31536000, immutable"
 
-# === Expose the agent charts folder as public static files ===
 
-# === Expose the agent charts folder as public static files ===
-# Any chart saved in CHARTS_DIR (myagents/charts/) will be accessible
-# via the URL path /charts/<filename>
-# Example:
-# If a chart is saved as myagents/charts/EURUSD_AtlasFX.png
-# You can view it in the browser at http://<your-server>/charts/EURUSD_AtlasFX.png
-# This works both locally (http://localhost:8000/charts/...)
-# and when deployed on a website/server.
+@app.get("/charts/{filename}")
+async def get_chart(filename: str, request: Request):
+    key = filename.removesuffix(".png")
+    if is_chart_key(key):
+        etag = f'"{key}"'
+        if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": IMMUTABLE})
+        png = await get_chart_png(key)
+        if png is not None:
+            return Response(png, media_type="image/png", headers={"ETag": etag, "Cache-Control": IMMUTABLE})
 
-app.mount("/charts", StaticFiles(directory=CHARTS_DIR), name="charts")
+    file_path = os.path.join(CHARTS_DIR, os.path.basename(filename))
+    if os.path.isfile(file_path):
+        return FileResponse(file_path)
+    raise HTTPException(status_code=404, detail="Chart not found")
 
 # === User query schema ===
+# mode "agentic": the model drives the tool calls (one round trip per step)
+# mode "direct":  the agent's fixed tool pipeline runs in Python, one LLM call for the write-up
 class UserQuery(BaseModel):
     message: str
+    mode: Literal["agentic", "direct"] = "agentic"
+    user_id: int = 1        # ai05_users row the conversation is logged under (1 = System)
+
+# === Agent runners per mode ===
+AGENTS = {
+    "AtlasFX": {"agentic": run_atlasfx, "direct": direct_atlasfx, "stream": stream_atlasfx},
+    "CryptoNova": {"agentic": run_cryptonova, "direct": direct_cryptonova, "stream": stream_cryptonova},
+    "JaneMacro": {"agentic": run_janemacro, "direct": direct_janemacro, "stream": stream_janemacro},
+    "MaxMentor": {"agentic": run_maxmentor, "direct": direct_maxmentor, "stream": stream_maxmentor},
+    "QuantEdge": {"agentic": run_quantedge, "direct": direct_quantedge, "stream": stream_quantedge},
+}
 
 # === Run agent and return summary + chart URLs + HTML img tags ===
 async def run_agent_and_parse(agent_func, user_message: str):
     # Call agent function directly
     response_text = await agent_func(user_message)
+    return await parse_agent_output(response_text)
 
-    summary = response_text
-    chart_urls = []
-    chart_imgs = []  # HTML <img> tags for direct display
-
-    try:
-        if "ChartData:" in response_text:
-            summary_part, chart_json_part = response_text.split("ChartData:", 1)
-            summary = summary_part.strip()
-            chart_data = json.loads(chart_json_part.strip())
-
-            if "chart_data" in chart_data:
-                for entry in chart_data["chart_data"]:
-                    filename = f"{entry['pair'].replace('/', '')}_{entry['source']}.png"
-                    file_path = os.path.join(CHARTS_DIR, filename)
+# === Single-flight: identical concurrent requests share one agent run ===
+# Requests for the same agent, mode and normalized message that arrive while a
+# run is in flight wait for that run instead of starting their own. The run is
+# a task of its own, so a waiter that goes away (client disconnect, orchestrator
+# timeout) does not cancel it for the others; it is cancelled once nobody waits.
+_in_flight: dict = {}       # (agent, mode, normalized message) -> {"task", "waiters"}
 
-                    # Save matplotlib chart
-                    entry["save_path"] = file_path
-                    plot_fx_setup(entry['pair'], entry['price'], save_path=file_path)
+def _forget_flight(key: tuple, flight: dict):
+    if _in_flight.get(key) is flight:
+        del _in_flight[key]
 
-                    # Relative URL for website
-                    url = f"/charts/{filename}"
-                    chart_urls.append(url)
+async def run_coalesced(name: str, mode: str, user_message: str) -> str:
+    key = (name, mode, normalize_prompt(user_message))
+    flight = _in_flight.get(key)
+    if flight is None:
+        task = asyncio.get_running_loop().create_task(AGENTS[name][mode](user_message))
+        flight = _in_flight[key] = {"task": task, "waiters": 0}
+        task.add_done_callback(lambda _: _forget_flight(key, flight))
+    else:
+        metrics.coalesced_requests.inc(1, name, mode)
+    flight["waiters"] += 1
+    try:
+        return await asyncio.shield(flight["task"])
+    finally:
+        flight["waiters"] -= 1
+        if flight["waiters"] == 0 and not flight["task"].done():
+            _forget_flight(key, flight)     # later requests start a fresh run
+            flight["task"].cancel()
 
-                    # HTML <img> tag for direct display
-                    chart_imgs.append(f'<img src="{url}" alt="{entry["pair"]} Chart">')
+# === Queue the exchange for ai05_chat_logs (written in batches in the background) ===
+def log_exchange(name: str, query: UserQuery, summary: str):
+    log_chat(query.message, user_id=query.user_id, is_ai_response=False, agent=name)
+    log_chat(summary, user_id=query.user_id, is_ai_response=True, agent=name)
 
-    except Exception as e:
-        print(f"⚠️ Warning: Failed to generate chart URLs: {e}")
+# === Run one agent in the requested mode and report timing ===
+async def run_agent_mode(name: str, query: UserQuery):
+    started = time.perf_counter()
+    status = "error"
+    try:
+        result = await parse_agent_output(await run_coalesced(name, query.mode, query.message))
+        status = "ok"
+    finally:
+        metrics.agent_run_seconds.observe(time.perf_counter() - started, name, query.mode, status)
+    elapsed = round(time.perf_counter() - started, 3)
+    result["timing"] = run_timing(name, query.mode, elapsed)
+    log_exchange(name, query, result["summary"])
+    return result
 
+def run_timing(name: str, mode: str, elapsed: float) -> dict:
     return {
-        "summary": summary,
-        "chart_urls": chart_urls,
-        "chart_imgs": chart_imgs  # new field for direct HTML display
+        "mode": mode,
+        "elapsed": elapsed,
+        # seconds saved against this agent's average uncached agentic run (None until one was seen)
+        "saved_vs_agentic": time_saved(name, elapsed) if mode == "direct" else None,
     }
 
 # === Individual endpoints ===
 @app.post("/run-atlasfx")
 async def run_atlasfx_agent(query: UserQuery):
-    return await run_agent_and_parse(run_atlasfx, query.message)
+    return await run_agent_mode("AtlasFX", query)
 
 @app.post("/run-cryptonova")
 async def run_cryptonova_agent(query: UserQuery):
-    return await run_agent_and_parse(run_cryptonova, query.message)
+    return await run_agent_mode("CryptoNova", query)
 
 @app.post("/run-janemacro")
 async def run_janemacro_agent(query: UserQuery):
-    return await run_agent_and_parse(run_janemacro, query.message)
+    return await run_agent_mode("JaneMacro", query)
 
 @app.post("/run-maxmentor")
 async def run_maxmentor_agent(query: UserQuery):
-    return await run_agent_and_parse(run_maxmentor, query.message)
+    return await run_agent_mode("MaxMentor", query)
 
 @app.post("/run-quantedge")
 async def run_quantedge_agent(query: UserQuery):
-    return await run_agent_and_parse(run_quantedge, query.message)
+    return await run_agent_mode("QuantEdge", query)
 
 # === Combined endpoint ===
 @app.post("/run-all-agents")
 async def run_all_agents(query: UserQuery):
-    agents = [
-        ("AtlasFX", run_atlasfx),
-        ("CryptoNova", run_cryptonova),
-        ("JaneMacro", run_janemacro),
-        ("MaxMentor", run_maxmentor),
-        ("QuantEdge", run_quantedge),
-    ]
+    jobs = [(name, partial(run_agent_mode, name)) for name in AGENTS]
+    outcomes = await run_agents_concurrently(jobs, query)
 
     results = {}
-    for name, agent_func in agents:
-        results[name] = await run_agent_and_parse(agent_func, query.message)
+    for name, outcome in outcomes.items():
+        if outcome["status"] == "ok":
+            results[name] = {**outcome["result"], "status": "ok", "elapsed": outcome["elapsed"]}
+        else:
+            results[name] = {"status": outcome["status"], "error": outcome["error"], "elapsed": outcome["elapsed"]}
     return results
+
+# === Streaming endpoints (Server-Sent Events) ===
+# POST /run-<agent>/stream and /run-all-agents/stream take the same body as the
+# JSON endpoints and answer with text/event-stream. Events, each tagged with the agent:
+#   start        the run began (sent immediately)
+#   tool_call    the model called a tool
+#   tool_output  the tool returned (preview of its output)
+#   delta        a chunk of the model's answer text
+#   charts       chart URLs + <img> tags, as soon as they exist
+#   done         summary and timing; error if the run failed
+# /run-all-agents/stream interleaves all five agents and ends with an "end" event.
+# When the client disconnects, the generators are closed and the runs cancelled.
+def sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+def charts_event(name: str, chart_urls: list) -> dict:
+    imgs = [f'<img src="{url}" alt="{name} Chart">' for url in chart_urls]
+    return {"event": "charts", "agent": name, "chart_urls": chart_urls, "chart_imgs": imgs}
+
+def tool_chart_urls(output) -> list:
+    """URLs for chart files a tool saved in CHARTS_DIR (e.g. generate_fx_charts)."""
+    if not isinstance(output, list):
+        return []
+    return [f"/charts/{quote(os.path.basename(entry['file']))}"
+            for entry in output if isinstance(entry, dict) and entry.get("file")]
+
+async def agent_events(name: str, query: UserQuery):
+    started = time.perf_counter()
+    metric_mode = "stream" if query.mode == "agentic" else query.mode
+    yield {"event": "start", "agent": name, "mode": query.mode}
+    try:
+        if query.mode == "direct":
+            # The direct pipeline runs in Python; there is nothing to report until it is done
+            response_text = await run_coalesced(name, "direct", query.message)
+        else:
+            response_text = ""
+            async with aclosing(AGENTS[name]["stream"](query.message)) as events:
+                async for event in events:
+                    if event["event"] == "final":
+                        response_text = event["output"] or ""
+                    elif event["event"] == "tool_output":
+                        yield {"event": "tool_output", "agent": name, "tool": event["tool"], "preview": event["preview"]}
+                        chart_urls = tool_chart_urls(event["output"])
+                        if chart_urls:
+                            yield charts_event(name, chart_urls)
+                    else:
+                        yield {**event, "agent": name}
+        result = await parse_agent_output(response_text)
+        if result["chart_urls"]:
+            yield {"event": "charts", "agent": name, "chart_urls": result["chart_urls"], "chart_imgs": result["chart_imgs"]}
+        metrics.agent_run_seconds.observe(time.perf_counter() - started, name, metric_mode, "ok")
+        elapsed = round(time.perf_counter() - started, 3)
+        log_exchange(name, query, result["summary"])
+        yield {"event": "done", "agent": name, "summary": result["summary"], "timing": run_timing(name, query.mode, elapsed)}
+    except Exception as e:
+        metrics.agent_run_seconds.observe(time.perf_counter() - started, name, metric_mode, "error")
+        yield {"event": "error", "agent": name, "error": str(e)}
+
+async def sse_stream(events):
+    async with aclosing(events):
+        async for event in events:
+            yield sse(event)
+
+def event_stream(events) -> StreamingResponse:
+    return StreamingResponse(
+        sse_stream(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/run-atlasfx/stream")
+async def stream_atlasfx_agent(query: UserQuery):
+    return event_stream(agent_events("AtlasFX", query))
+
+@app.post("/run-cryptonova/stream")
+async def stream_cryptonova_agent(query: UserQuery):
+    return event_stream(agent_events("CryptoNova", query))
+
+@app.post("/run-janemacro/stream")
+async def stream_janemacro_agent(query: UserQuery):
+    return event_stream(agent_events("JaneMacro", query))
+
+@app.post("/run-maxmentor/stream")
+async def stream_maxmentor_agent(query: UserQuery):
+    return event_stream(agent_events("MaxMentor", query))
+
+@app.post("/run-quantedge/stream")
+async def stream_quantedge_agent(query: UserQuery):
+    return event_stream(agent_events("QuantEdge", query))
+
+async def all_agent_events(query: UserQuery):
+    jobs = [(name, partial(agent_events, name)) for name in AGENTS]
+    async with aclosing(stream_agents_concurrently(jobs, query)) as events:
+        async for event in events:
+            yield event
+    yield {"event": "end"}
+
+@app.post("/run-all-agents/stream")
+async def stream_all_agents(query: UserQuery):
+    return event_stream(all_agent_events(query))
+
+# === Latest scheduler results (see scheduler.py and myagents/snapshots.py): no agent run, Age in seconds ===
+@app.get("/latest/{agent}")
+async def latest(agent: str):
+    name = next((n for n in AGENTS if n.lower() == agent.lower()), None)
+    found = latest_snapshot(name) if name else None
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"No snapshot for {agent}")
+    snapshot, body = found
+    headers = {
+        "Age": str(max(0, int(time.time() - snapshot["generated_at"]))),
+        "Last-Modified": formatdate(snapshot["generated_at"], usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    return Response(body, media_type="application/json", headers=headers)
+
+# === Admin access (/chat-logs, /admin/*): X-Admin-Token must match ADMIN_TOKEN, no access while it is unset ===
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")      # overridable from .env; separate from the profiler's PROFILE_TOKEN
+
+def check_admin(request: Request):
+    if not ADMIN_TOKEN or not hmac.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+# === Chat history (admin only; newest first, keyset pagination: pass next_cursor back as cursor) ===
+@app.get("/chat-logs")
+async def chat_logs(request: Request, user_id: int = 1, agent: str | None = None, cursor: str | None = None,
+                    limit: int = 50):
+    check_admin(request)
+    try:
+        return await get_chat_logs(user_id, agent=agent, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# === Cache counters (for sizing QUOTE_CACHE_TTL / CHART_CACHE_BYTES against real load) ===
+@app.get("/cache-stats")
+async def cache_stats():
+    return {
+        "quotes": quote_cache.stats(),
+        "responses": response_cache.stats(),
+        "charts": chart_cache_stats(),
+        "chart_store": chart_store.stats(),
+        "chat_log_writer": chat_log_writer.stats(),
+        "quote_writer": quote_writer.stats(),
+    }
+
+# === Per-source health (circuit state, error rate, parse rate, latency) ===
+@app.get("/source-health")
+async def source_health():
+    return source_registry.snapshot()
+
+# === Metrics (Prometheus text format) ===
+# Histograms: agent runs, LLM calls and tokens, tool calls, upstream fetches,
+# chart renders and DB writes (see myagents/metrics.py). The gauges below read
+# the existing counters at scrape time, so they cost nothing on the request path.
+metrics.Gauge("ai05_cache_lookups", "Cache lookups by result.",
+              lambda: {("quotes", "hit"): quote_cache.hits, ("quotes", "stale_hit"): quote_cache.stale_hits,
+                       ("quotes", "miss"): quote_cache.misses, ("responses", "hit"): response_cache.hits,
+                       ("responses", "miss"): response_cache.misses},
+              labels=("cache", "result"))
+metrics.Gauge("ai05_db_writer_queued", "Rows waiting in a batch writer queue.",
+              lambda: {(w.name,): w.stats()["queued"] for w in (chat_log_writer, quote_writer)}, labels=("writer",))
+metrics.Gauge("ai05_db_writer_dropped", "Rows dropped because a batch writer queue was full.",
+              lambda: {(w.name,): w.dropped for w in (chat_log_writer, quote_writer)}, labels=("writer",))
+metrics.Gauge("ai05_source_circuit_open", "1 while a source's circuit breaker is open.",
+              lambda: {(name,): int(snap["state"] != "closed") for name, snap in source_registry.snapshot().items()},
+              labels=("source",))
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# === Profiles (see myagents/profiler.py) ===
+@app.get("/admin/profiles")
+async def admin_profiles(request: Request):
+    check_admin(request)
+    return await asyncio.to_thread(list_profiles)
+
+@app.get("/admin/profiles/{name}")
+async def admin_profile(name: str, request: Request):
+    check_admin(request)
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=name)
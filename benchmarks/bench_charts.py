@@ -0,0 +1,49 @@
+# benchmarks/bench_charts.py
+# Chart rendering throughput: plot_fx_setup (new pyplot figure per chart)
+# against plot_fx_batch (one reused figure per call), plus a leak check.
+#
+#   python -m benchmarks.bench_charts [N]
+
+import gc
+import sys
+import time
+import tempfile
+
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+from myagents.fx_graphs import plot_fx_setup, plot_fx_batch
+
+
+def _records(n: int, out_dir: str) -> list:
+    return [{"pair": "USD/JPY", "price": 145 + (i % 100) / 10, "source": f"Bench{i % 7}",
+             "save_path": f"{out_dir}/bench_{i}.png"} for i in range(n)]
+
+
+def _live_figures() -> int:
+    gc.collect()
+    return sum(isinstance(o, Figure) for o in gc.get_objects())
+
+
+def main(n: int = 50):
+    with tempfile.TemporaryDirectory() as out_dir:
+        records = _records(n, out_dir)
+
+        started = time.perf_counter()
+        for r in records:
+            plot_fx_setup(r["pair"], r["price"], source=r["source"], save_path=r["save_path"])
+        single = time.perf_counter() - started
+
+        before = _live_figures()
+        started = time.perf_counter()
+        plot_fx_batch(records)
+        batch = time.perf_counter() - started
+        after = _live_figures()
+
+    print(f"plot_fx_setup : {n / single:6.1f} charts/s  ({single / n * 1000:.1f} ms/chart)")
+    print(f"plot_fx_batch : {n / batch:6.1f} charts/s  ({batch / n * 1000:.1f} ms/chart)  x{single / batch:.2f}")
+    print(f"figures leaked: {after - before}  (pyplot figures open: {len(plt.get_fignums())})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
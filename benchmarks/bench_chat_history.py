@@ -0,0 +1,112 @@
+# benchmarks/bench_chat_history.py
+# Chat history paging: keyset pagination (db/chat_history.py) against OFFSET,
+# on ai05_chat_logs seeded with a growing number of rows. Keyset latency should
+# stay flat as the table and the page depth grow; OFFSET grows with the depth.
+#
+#   python -m benchmarks.bench_chat_history [ROWS ...]
+#
+# Uses DATABASE_URL if set (point it at a scratch database: rows are added to
+# ai05_chat_logs, and users 1..USERS to ai05_users if missing), else a
+# temporary SQLite file.
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_tmp.name}/bench_chat_history.sqlite3")
+
+from sqlalchemy import select, func, insert
+
+from db.mydatabase import engine, async_session, create_tables, ChatLogAI05, UserAI05
+from db.batch_writer import bulk_insert, CHAT_LOG_COLUMNS
+from db.chat_history import get_chat_logs
+
+USERS = 20
+AGENTS = ["AtlasFX", "CryptoNova", "JaneMacro", "MaxMentor", "QuantEdge"]
+PAGE = 50
+REPEATS = 20
+SEED_BATCH = 5000
+
+
+async def _ensure_users():
+    """ai05_users rows 1..USERS, which the seeded chat logs reference (enforced on Postgres)."""
+    async with async_session() as session:
+        existing = set((await session.scalars(select(UserAI05.id).where(UserAI05.id <= USERS))).all())
+        missing = [{"id": i, "name": f"Bench user {i}", "email": f"bench{i}@ai05.local", "password": "",
+                    "profile_picture": "", "is_ai_user": False, "persona_json": {}}
+                   for i in range(1, USERS + 1) if i not in existing]
+        if missing:
+            await session.execute(insert(UserAI05), missing)
+            await session.commit()
+
+
+async def _seed(start: int, count: int):
+    base = datetime(2025, 1, 1)
+    for offset in range(0, count, SEED_BATCH):
+        rows = []
+        for i in range(start + offset, start + min(offset + SEED_BATCH, count)):
+            rows.append({
+                "user_id": 1 + i % USERS, "agent": AGENTS[i % len(AGENTS)], "message": f"message {i}",
+                "is_ai_response": bool(i % 2), "created_at": base + timedelta(seconds=i),
+            })
+        await bulk_insert(ChatLogAI05, CHAT_LOG_COLUMNS, rows)
+
+
+async def _timed(coro_factory) -> float:
+    samples = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        await coro_factory()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+async def _keyset_at(depth: int) -> str | None:
+    """Cursor for the page `depth` pages deep (walked once, outside the timing)."""
+    cursor = None
+    for _ in range(depth):
+        cursor = (await get_chat_logs(1, cursor=cursor, limit=PAGE))["next_cursor"]
+        if cursor is None:
+            break
+    return cursor
+
+
+async def _offset_page(depth: int):
+    query = (
+        select(ChatLogAI05.id, ChatLogAI05.agent, ChatLogAI05.message, ChatLogAI05.created_at)
+        .where(ChatLogAI05.user_id == 1)
+        .order_by(ChatLogAI05.created_at.desc(), ChatLogAI05.id.desc())
+        .offset(depth * PAGE).limit(PAGE)
+    )
+    async with async_session() as session:
+        return (await session.execute(query)).all()
+
+
+async def main(sizes: list):
+    await create_tables()
+    await _ensure_users()
+    async with async_session() as session:
+        seeded = (await session.scalar(select(func.count()).select_from(ChatLogAI05))) or 0
+
+    print(f"{'rows':>10} {'user rows':>10} {'depth':>6} {'keyset ms':>10} {'offset ms':>10}")
+    for size in sizes:
+        if size > seeded:
+            await _seed(seeded, size - seeded)
+            seeded = size
+        user_rows = seeded // USERS
+        for depth in (0, user_rows // PAGE // 10, user_rows // PAGE - 1):
+            depth = max(depth, 0)
+            cursor = await _keyset_at(depth)
+            keyset = await _timed(lambda: get_chat_logs(1, cursor=cursor, limit=PAGE))
+            offset = await _timed(lambda: _offset_page(depth))
+            print(f"{seeded:>10} {user_rows:>10} {depth:>6} {keyset:>10.2f} {offset:>10.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]))
@@ -0,0 +1,67 @@
+# benchmarks/bench_hedging.py
+# Compares plain fan-out against hedged fetching on local stub sources where
+# the preferred providers occasionally stall.
+#
+#   python -m benchmarks.bench_hedging
+
+import math
+import time
+import asyncio
+import statistics
+
+from benchmarks.stub_sources import StubSources, StubProfile
+from myagents import fx_fetch
+from myagents.clients import close_clients
+from myagents.source_health import source_registry
+
+RUNS = 60
+STALL_EVERY = 15          # one in 15 requests to Stally-C hangs for 1.5s
+
+PROFILES = [
+    StubProfile("Fast-A", delay=0.03, jitter=0.02),
+    StubProfile("Fast-B", delay=0.04, jitter=0.02),
+    StubProfile("Stally-C", delay=0.05, jitter=0.0),         # fast, but stalls now and then
+    StubProfile("Backup-D", delay=0.12, jitter=0.03),
+    StubProfile("Backup-E", delay=0.15, jitter=0.03),
+    StubProfile("Broken-F", delay=0.01, error_rate=1.0),
+]
+
+
+def _report(label: str, samples: list):
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    # nearest rank
+    p90 = samples[max(0, math.ceil(len(samples) * 0.9) - 1)]
+    p99 = samples[max(0, math.ceil(len(samples) * 0.99) - 1)]
+    print(f"{label:<10} p50={p50 * 1000:7.1f}ms  p90={p90 * 1000:7.1f}ms  p99={p99 * 1000:7.1f}ms  max={samples[-1] * 1000:7.1f}ms")
+
+
+async def _bench(stubs: StubSources, fetch) -> list:
+    stally = stubs.profiles["Stally-C"]
+    timings = []
+    for i in range(RUNS):
+        stally.delay = 1.5 if i % STALL_EVERY == 0 else 0.05
+        started = time.perf_counter()
+        await fetch(stubs.sources())
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+async def main():
+    with StubSources(PROFILES) as stubs:
+        # Warm the latency histograms so hedge thresholds are data driven.
+        for _ in range(10):
+            await fx_fetch.fetch_all_sources(stubs.sources())
+
+        fanout = await _bench(stubs, lambda srcs: fx_fetch.fetch_all_sources(srcs, deadline=3.0))
+        hedged = await _bench(stubs, lambda srcs: fx_fetch.fetch_hedged(srcs, want=3, max_hedges=2, deadline=3.0))
+
+    _report("fan-out", fanout)
+    _report("hedged", hedged)
+    for name, snap in source_registry.snapshot().items():
+        print(f"  {name:<9} state={snap['state']:<9} p90={snap['p90_latency']}")
+    await close_clients()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
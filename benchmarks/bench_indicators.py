@@ -0,0 +1,49 @@
+# benchmarks/bench_indicators.py
+# Cost of the full indicator set (myagents/indicators.py) as the number of
+# symbols grows. Everything is computed on one (symbols, periods) array, so
+# the cost per symbol should stay flat (or fall) from 5 to 5,000 symbols.
+#
+#   python -m benchmarks.bench_indicators [PERIODS]
+
+import sys
+import time
+import statistics
+
+import numpy as np
+
+from myagents import indicators
+
+SYMBOLS = [5, 50, 500, 5000]
+REPEATS = 7
+
+
+def _prices(symbols: int, periods: int) -> np.ndarray:
+    rng = np.random.default_rng(42)
+    returns = rng.normal(0.0003, 0.015, size=(symbols, periods))
+    return 100 * np.exp(np.cumsum(returns, axis=1))
+
+
+def _all_indicators(prices: np.ndarray):
+    indicators.sma(prices, 20)
+    indicators.ema(prices, 20)
+    indicators.macd(prices)
+    indicators.rsi(prices)
+    indicators.bollinger(prices)
+    indicators.realized_volatility(prices)
+
+
+def main(periods: int = 252):
+    print(f"{'symbols':>8} {'total ms':>10} {'µs/symbol':>10}")
+    for symbols in SYMBOLS:
+        prices = _prices(symbols, periods)
+        samples = []
+        for _ in range(REPEATS):
+            started = time.perf_counter()
+            _all_indicators(prices)
+            samples.append(time.perf_counter() - started)
+        total = statistics.median(samples)
+        print(f"{symbols:>8} {total * 1000:>10.2f} {total / symbols * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 252)
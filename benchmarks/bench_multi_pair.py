@@ -0,0 +1,62 @@
+# benchmarks/bench_multi_pair.py
+# Upstream calls and latency of fetch_pairs (myagents/fx_fetch.py) for 1 to 30
+# pairs, on local stub providers shaped like FREE_SOURCES: five return a whole
+# rate table per call, the rest quote one pair per call. Batch providers are planned first, so the
+# number of upstream calls (and the wall time) should barely move with the
+# number of pairs.
+#
+#   python -m benchmarks.bench_multi_pair
+
+import time
+import asyncio
+import itertools
+import statistics
+
+from benchmarks.stub_sources import StubSources, StubProfile, RATES
+from myagents import fx_fetch
+from myagents.clients import close_clients
+from myagents.quote_cache import quote_cache
+
+RUNS = 10
+PAIR_COUNTS = [1, 5, 10, 30]
+
+PROFILES = [
+    StubProfile("Table-A", delay=0.04, jitter=0.02, rates=RATES, batch="table"),
+    StubProfile("Table-B", delay=0.05, jitter=0.02, rates=RATES, batch="table"),
+    StubProfile("Table-C", delay=0.06, jitter=0.02, rates=RATES, batch="table"),
+    StubProfile("Table-D", delay=0.07, jitter=0.02, rates=RATES, batch="table"),
+    StubProfile("Table-E", delay=0.08, jitter=0.02, rates=RATES, batch="table"),
+    StubProfile("Single-G", delay=0.04, jitter=0.02, rates=RATES),
+    StubProfile("Single-H", delay=0.05, jitter=0.02, rates=RATES),
+    StubProfile("Single-I", delay=0.06, jitter=0.02, rates=RATES),
+]
+
+
+def _pairs(count: int) -> list:
+    currencies = ["USD", *RATES]
+    pairs = [f"{a}/{b}" for a, b in itertools.permutations(currencies, 2)]
+    return ["USD/JPY", *[p for p in pairs if p != "USD/JPY"]][:count]
+
+
+async def main():
+    print(f"{'pairs':>6} {'calls/run':>10} {'quotes/pair':>12} {'p50 ms':>8} {'max ms':>8}")
+    with StubSources(PROFILES) as stubs:
+        sources = stubs.sources()
+        for count in PAIR_COUNTS:
+            pairs = _pairs(count)
+            timings, quotes = [], []
+            before = stubs.requests()
+            for _ in range(RUNS):
+                quote_cache.clear()
+                started = time.perf_counter()
+                answers = await fx_fetch.fetch_pairs(pairs, sources)
+                timings.append(time.perf_counter() - started)
+                quotes.append(statistics.mean(len(a) for a in answers.values()))
+            calls = (stubs.requests() - before) / RUNS
+            print(f"{count:>6} {calls:>10.1f} {statistics.mean(quotes):>12.1f} "
+                  f"{statistics.median(timings) * 1000:>8.1f} {max(timings) * 1000:>8.1f}")
+    await close_clients()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,185 @@
+# benchmarks/bench_offline.py
+# End-to-end benchmark that needs no network: the model is a ScriptedModel (or
+# a ReplayModel of a recorded session, see benchmarks/fake_model.py) and
+# FREE_SOURCES point at local stub providers with seeded latency and error
+# profiles (benchmarks/stub_sources.py). Reports latency distributions for:
+#   - run_agent of each agent
+#   - run_agent_and_parse (api.py) of each agent
+#   - plot_fx_setup throughput
+#   - POST /run-all-agents under concurrent load
+#
+#   python -m benchmarks.bench_offline [--runs N] [--concurrency 1,4,16]
+#       [--model-delay S] [--replay FILE | --record FILE] [--cached]
+#
+# --record runs the real Gemini model (GEMINI_API_KEY needed) against the stubs
+# and writes FILE for later --replay runs. The response cache is disabled unless
+# --cached, so every run is a full agent run. The database is a temporary SQLite
+# file unless DATABASE_URL is set.
+
+import os
+import sys
+import math
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+AGENT_NAMES = ["AtlasFX", "CryptoNova", "JaneMacro", "MaxMentor", "QuantEdge"]
+QUESTION = "Give me today's summary and charts."
+
+
+def _parse_args(argv: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline latency benchmark (stub sources, fake model).")
+    parser.add_argument("--runs", type=int, default=10, help="runs per agent and per load level")
+    parser.add_argument("--concurrency", default="1,4,16", help="concurrent /run-all-agents clients")
+    parser.add_argument("--charts", type=int, default=30, help="charts for the plot_fx_setup section")
+    parser.add_argument("--model-delay", type=float, default=0.4, help="scripted model latency per call, seconds")
+    parser.add_argument("--source-delay", type=float, default=0.08, help="typical stub provider latency, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="share of stub requests that fail")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--replay", metavar="FILE", help="replay a recorded model session")
+    group.add_argument("--record", metavar="FILE", help="record the real model into FILE")
+    parser.add_argument("--cached", action="store_true", help="keep the response cache on")
+    return parser.parse_args(argv)
+
+
+ARGS = _parse_args(sys.argv[1:]) if __name__ == "__main__" else None
+
+# === Environment, before any agent module is imported ===
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_tmp.name}/bench_offline.sqlite3")
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+if ARGS is not None and not ARGS.cached:
+    for name in AGENT_NAMES:
+        os.environ[f"RESPONSE_CACHE_TTL_{name.upper()}"] = "0"
+
+from myagents import clients
+from benchmarks.fake_model import ScriptedModel, ReplayModel, RecordingModel
+
+
+def _install_model(args: argparse.Namespace):
+    if args.record:
+        model = RecordingModel(clients.get_model(), args.record)
+    elif args.replay:
+        model = ReplayModel(args.replay, delay=args.model_delay, jitter=args.model_delay / 2, seed=1)
+    else:
+        model = ScriptedModel(delay=args.model_delay, jitter=args.model_delay / 2, seed=1)
+    clients.set_model(model)
+    return model
+
+
+# === Reporting ===
+def _report(label: str, samples: list, unit: str = "ms", scale: float = 1000):
+    samples = sorted(samples)
+    if not samples:
+        print(f"  {label:<28} no samples")
+        return
+    pick = lambda q: samples[max(0, math.ceil(len(samples) * q) - 1)]      # nearest rank
+    print(f"  {label:<28} n={len(samples):<4} p50={statistics.median(samples) * scale:8.1f}{unit} "
+          f"p90={pick(0.9) * scale:8.1f}{unit} p99={pick(0.99) * scale:8.1f}{unit} max={samples[-1] * scale:8.1f}{unit}")
+
+
+async def _timed(func, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+# === Sections ===
+async def bench_run_agent(api, runs: int):
+    print("run_agent (agentic):")
+    for name in AGENT_NAMES:
+        run = api.AGENTS[name]["agentic"]
+        _report(name, await _timed(lambda: run(QUESTION), runs))
+
+
+async def bench_run_agent_and_parse(api, runs: int):
+    print("run_agent_and_parse (agentic / direct):")
+    for name in AGENT_NAMES:
+        for mode in ("agentic", "direct"):
+            run = api.AGENTS[name][mode]
+            _report(f"{name} {mode}", await _timed(lambda: api.run_agent_and_parse(run, QUESTION), runs))
+
+
+def bench_plot_fx_setup(count: int):
+    from myagents.fx_graphs import plot_fx_setup
+
+    print("plot_fx_setup:")
+    history = [150 + 0.02 * i for i in range(240)]
+    with tempfile.TemporaryDirectory() as out_dir:
+        samples = []
+        started = time.perf_counter()
+        for i in range(count):
+            chart_started = time.perf_counter()
+            plot_fx_setup("USD/JPY", 150.2 + i / 100, source="Bench",
+                          save_path=f"{out_dir}/bench_{i}.png", history=history)
+            samples.append(time.perf_counter() - chart_started)
+        total = time.perf_counter() - started
+    _report("per chart", samples)
+    print(f"  {'throughput':<28} {count / total:.1f} charts/s")
+
+
+async def bench_run_all_agents(app, runs: int, levels: list):
+    import httpx
+
+    print("POST /run-all-agents under load:")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        for level in levels:
+            total = max(runs, level)
+            queue = asyncio.Queue()
+            for _ in range(total):
+                queue.put_nowait(None)
+            samples, failures = [], 0
+
+            async def worker():
+                nonlocal failures
+                while not queue.empty():
+                    queue.get_nowait()
+                    started = time.perf_counter()
+                    resp = await client.post("/run-all-agents", json={"message": QUESTION})
+                    samples.append(time.perf_counter() - started)
+                    statuses = resp.json().values() if resp.status_code == 200 else [{"status": "http"}]
+                    failures += sum(r.get("status") != "ok" for r in statuses)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(level)))
+            wall = time.perf_counter() - started
+            _report(f"{level} concurrent", samples)
+            print(f"  {'':<28} {total / wall:.2f} req/s, {failures} agent failures")
+
+
+async def main(args: argparse.Namespace):
+    from benchmarks.stub_sources import StubSources, free_source_profiles
+    from myagents.fx_sources import FREE_SOURCES
+
+    model = _install_model(args)
+    profiles = free_source_profiles(FREE_SOURCES, delay=args.source_delay, error_rate=args.error_rate)
+    with StubSources(profiles) as stubs:
+        # Same list object the agents hold, so they now fetch from the stubs
+        FREE_SOURCES[:] = stubs.sources()
+
+        import api
+        from myagents import atlasfx_agent
+        from db.mydatabase import create_tables
+
+        atlasfx_agent.WEB_CHARTS_DIR = _tmp.name      # agentic AtlasFX runs save charts; keep them out of the tree
+
+        await create_tables()
+        async with api.app.router.lifespan_context(api.app):
+            await bench_run_agent(api, args.runs)
+            await bench_run_agent_and_parse(api, args.runs)
+            bench_plot_fx_setup(args.charts)
+            await bench_run_all_agents(api.app, args.runs, [int(n) for n in args.concurrency.split(",")])
+
+        print(f"model calls: {model.calls if hasattr(model, 'calls') else '-'}"
+              f"{f', replay misses: {model.misses}' if isinstance(model, ReplayModel) else ''}"
+              f", stub requests: {stubs.requests()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(ARGS))
@@ -0,0 +1,222 @@
+# benchmarks/fake_model.py
+# Offline stand-ins for the Gemini model, plugged in with clients.set_model()
+# before the agent modules are imported:
+# - ScriptedModel calls each of the agent's tools once, in order, then writes a
+#   short answer from their outputs; model latency is simulated
+# - RecordingModel wraps a real model and appends every response to a JSONL file
+# - ReplayModel answers from such a recording (ScriptedModel for anything missing)
+# Responses are keyed on the shape of the conversation (instructions, user
+# message, tools called so far), not on tool outputs, so live prices and
+# artifact handles don't break a replay. A tool argument named like a key of an
+# earlier tool output (e.g. the `fx_data` handle) is filled from the live output.
+
+import ast
+import json
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+
+from pydantic import TypeAdapter
+from agents import ModelResponse, Usage
+from agents.models.interface import Model
+from openai.types.responses import (
+    Response, ResponseCompletedEvent, ResponseFunctionToolCall, ResponseOutputItem,
+    ResponseOutputMessage, ResponseOutputText, ResponseTextDeltaEvent,
+)
+
+OUTPUT_ITEM = TypeAdapter(ResponseOutputItem)
+DELTA_CHARS = 40              # streamed answer chunk size
+
+
+# === Conversation helpers ===
+def _field(item, name: str):
+    return item.get(name) if isinstance(item, dict) else getattr(item, name, None)
+
+
+def _tool_output(text):
+    """Tool outputs reach the model as str(result): JSON, a Python repr, or plain text."""
+    for parse in (json.loads, ast.literal_eval):
+        try:
+            return parse(text)
+        except (TypeError, ValueError, SyntaxError):
+            continue
+    return text
+
+
+def conversation(input) -> tuple:
+    """(user message, names of the tools called so far, tool outputs so far)."""
+    if isinstance(input, str):
+        return input, [], []
+    user, called, outputs = "", [], []
+    for item in input:
+        kind = _field(item, "type")
+        if not user and _field(item, "role") == "user":
+            content = _field(item, "content")
+            user = content if isinstance(content, str) else json.dumps(content, default=str)
+        elif kind == "function_call":
+            called.append(_field(item, "name"))
+        elif kind == "function_call_output":
+            outputs.append(_tool_output(_field(item, "output")))
+    return user, called, outputs
+
+
+def response_key(system_instructions: str | None, input) -> str:
+    user, called, _ = conversation(input)
+    shape = [system_instructions or "", " ".join(user.lower().split()), called]
+    return hashlib.sha256(json.dumps(shape).encode()).hexdigest()[:16]
+
+
+def fill_arguments(tool, arguments: dict, outputs: list) -> dict:
+    """Arguments for `tool`, with parameters found in earlier dict outputs taken from the latest one."""
+    arguments = dict(arguments)
+    for name in (tool.params_json_schema.get("properties") or {}):
+        for output in reversed(outputs):
+            if isinstance(output, dict) and name in output:
+                arguments[name] = output[name]
+                break
+    return arguments
+
+
+def _tool_call(name: str, arguments: dict) -> ResponseFunctionToolCall:
+    return ResponseFunctionToolCall(
+        type="function_call", id=f"fc_{uuid.uuid4().hex}", call_id=uuid.uuid4().hex,
+        name=name, arguments=json.dumps(arguments),
+    )
+
+
+def _message(text: str) -> ResponseOutputMessage:
+    return ResponseOutputMessage(
+        id=f"msg_{uuid.uuid4().hex}", type="message", role="assistant", status="completed",
+        content=[ResponseOutputText(type="output_text", text=text, annotations=[])],
+    )
+
+
+# === Streaming on top of get_response ===
+class _StreamsResponse(Model):
+    async def stream_response(self, system_instructions, input, model_settings, tools,
+                              output_schema, handoffs, tracing, **kwargs):
+        response = await self.get_response(system_instructions, input, model_settings, tools,
+                                           output_schema, handoffs, tracing, **kwargs)
+        sequence = 0
+        for item in response.output:
+            if isinstance(item, ResponseOutputMessage):
+                text = "".join(part.text for part in item.content if hasattr(part, "text"))
+                for start in range(0, len(text), DELTA_CHARS):
+                    sequence += 1
+                    yield ResponseTextDeltaEvent(
+                        type="response.output_text.delta", delta=text[start:start + DELTA_CHARS],
+                        item_id=item.id, output_index=0, content_index=0, sequence_number=sequence, logprobs=[],
+                    )
+        completed = Response(
+            id=f"resp_{uuid.uuid4().hex}", created_at=time.time(), model="offline", object="response",
+            output=response.output, tool_choice="auto", tools=[], parallel_tool_calls=False,
+        )
+        yield ResponseCompletedEvent(type="response.completed", response=completed, sequence_number=sequence + 1)
+
+
+# === Scripted ===
+class ScriptedModel(_StreamsResponse):
+    """Calls every tool once, in order, then answers. Each call takes `delay` ± `jitter` seconds."""
+
+    def __init__(self, delay: float = 0.4, jitter: float = 0.2, seed: int | None = None):
+        self.delay = delay
+        self.jitter = jitter
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    async def get_response(self, system_instructions, input, model_settings, tools,
+                           output_schema, handoffs, tracing, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.delay + self._random.uniform(-self.jitter, self.jitter)))
+        return ModelResponse(output=self.respond(input, tools), usage=Usage(), response_id=None)
+
+    def respond(self, input, tools) -> list:
+        _, called, outputs = conversation(input)
+        if len(called) < len(tools):
+            tool = tools[len(called)]
+            return [_tool_call(tool.name, fill_arguments(tool, {}, outputs))]
+        return [_message(self.answer(input, outputs))]
+
+    def answer(self, input, outputs: list) -> str:
+        user, _, _ = conversation(input)
+        lines = [f"Answer to: {user[:120]}"]
+        chart_data = None
+        for output in outputs:
+            if isinstance(output, dict) and "chart_data" in output:
+                chart_data = output
+            lines.append(str(output)[:200])
+        if chart_data is not None:
+            lines.append(f"ChartData: {json.dumps(chart_data, default=str)}")
+        return "\n".join(lines)
+
+
+# === Record / replay ===
+class RecordingModel(_StreamsResponse):
+    """Passes calls through to `inner` and appends each response to a JSONL file."""
+
+    def __init__(self, inner: Model, path: str):
+        self.inner = inner
+        self.path = path
+
+    def _record(self, system_instructions, input, output: list, elapsed: float):
+        entry = {
+            "key": response_key(system_instructions, input),
+            "elapsed": round(elapsed, 4),
+            "output": [item.model_dump(mode="json", exclude_none=True) for item in output],
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    async def get_response(self, system_instructions, input, *args, **kwargs):
+        started = time.perf_counter()
+        response = await self.inner.get_response(system_instructions, input, *args, **kwargs)
+        self._record(system_instructions, input, response.output, time.perf_counter() - started)
+        return response
+
+    async def stream_response(self, system_instructions, input, *args, **kwargs):
+        started = time.perf_counter()
+        async for event in self.inner.stream_response(system_instructions, input, *args, **kwargs):
+            if isinstance(event, ResponseCompletedEvent):
+                self._record(system_instructions, input, event.response.output, time.perf_counter() - started)
+            yield event
+
+
+class ReplayModel(ScriptedModel):
+    """
+    Answers from a RecordingModel file, with the recorded latency (times
+    `speed`). Conversations that were never recorded fall back to the script.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, **scripted):
+        super().__init__(**scripted)
+        self.speed = speed
+        self.recorded = {}
+        self.misses = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.recorded.setdefault(entry["key"], entry)
+
+    async def get_response(self, system_instructions, input, model_settings, tools,
+                           output_schema, handoffs, tracing, **kwargs):
+        entry = self.recorded.get(response_key(system_instructions, input))
+        if entry is None:
+            self.misses += 1
+            return await super().get_response(system_instructions, input, model_settings, tools,
+                                              output_schema, handoffs, tracing, **kwargs)
+        self.calls += 1
+        await asyncio.sleep(entry["elapsed"] * self.speed)
+        _, _, outputs = conversation(input)
+        by_name = {tool.name: tool for tool in tools}
+        output = []
+        for raw in entry["output"]:
+            item = OUTPUT_ITEM.validate_python(raw)
+            if isinstance(item, ResponseFunctionToolCall) and item.name in by_name:
+                # Handles in the recording belong to the recorded run; use the live ones
+                arguments = fill_arguments(by_name[item.name], json.loads(item.arguments or "{}"), outputs)
+                item = _tool_call(item.name, arguments)
+            output.append(item)
+        return ModelResponse(output=output, usage=Usage(), response_id=None)
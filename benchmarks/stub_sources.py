@@ -0,0 +1,138 @@
+# benchmarks/stub_sources.py
+# Local stub HTTP server that impersonates FX providers, with injected delays
+# and error rates, so the fetch engine can be exercised without the network.
+#
+# Every stub source is served from the same server under /<name>; its profile
+# decides how long it sleeps and how often it fails. A profile with `rates`
+# (currency -> units per USD) quotes any pair: one pair per request
+# (?symbol=EURJPY), or the whole table at once when `batch` is "table".
+
+import json
+import time
+import random
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubProfile:
+    def __init__(self, name: str, delay: float = 0.05, jitter: float = 0.0,
+                 error_rate: float = 0.0, price: float = 150.0, html: bool = False,
+                 rates: dict | None = None, batch: str | None = None):
+        self.name = name
+        self.delay = delay            # base latency, seconds
+        self.jitter = jitter          # extra uniform latency, seconds
+        self.error_rate = error_rate  # share of requests answered with HTTP 500
+        self.price = price
+        self.html = html              # answer with an HTML page (never parses)
+        self.rates = rates            # units per USD, e.g. {"JPY": 150.0, "EUR": 0.92}
+        self.batch = batch            # "table": one request returns the whole rate table
+        self.requests = 0
+
+    def body(self, query: dict | None = None) -> tuple:
+        self.requests += 1
+        if random.random() < self.error_rate:
+            return 500, b'{"error": "stub failure"}', "application/json"
+        if self.html:
+            return 200, b"<html><body>quote page</body></html>", "text/html"
+        if self.rates and self.batch == "table":
+            return 200, json.dumps({"base": "USD", "rates": self.rates}).encode(), "application/json"
+        symbol = (query or {}).get("symbol", [""])[0]
+        if self.rates and len(symbol) == 6:
+            rates = {**self.rates, "USD": 1.0}
+            price = rates[symbol[3:]] / rates[symbol[:3]]
+            return 200, json.dumps({"price": price}).encode(), "application/json"
+        return 200, json.dumps({"price": self.price}).encode(), "application/json"
+
+
+class StubSources:
+    """Context manager running a threaded stub server for a list of StubProfile."""
+
+    def __init__(self, profiles: list):
+        self.profiles = {p.name: p for p in profiles}
+        self._server = None
+
+    def __enter__(self):
+        profiles = self.profiles
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                profile = profiles.get(url.path.strip("/"))
+                if profile is None:
+                    self.send_error(404)
+                    return
+                time.sleep(profile.delay + random.uniform(0, profile.jitter))
+                status, body, ctype = profile.body(parse_qs(url.query))
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", ctype)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass                  # client cancelled (hedge loser or deadline)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 128      # the default backlog of 5 drops bursts of connects (1s SYN retry)
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def sources(self) -> list:
+        """FREE_SOURCES-style entries pointing at the stubs."""
+        sources = []
+        for name, profile in self.profiles.items():
+            if profile.batch:
+                sources.append({"name": name, "url": f"{self.base_url}/{name}", "batch": profile.batch})
+            elif profile.rates:
+                sources.append({"name": name, "url": f"{self.base_url}/{name}?symbol={{base}}{{quote}}"})
+            else:
+                sources.append({"name": name, "url": f"{self.base_url}/{name}"})
+        return sources
+
+    def requests(self) -> int:
+        """Requests served so far, all profiles."""
+        return sum(p.requests for p in self.profiles.values())
+
+
+# === Stand-ins for FREE_SOURCES ===
+# Units per USD, the rate table every rate-aware stub quotes from
+RATES = {"JPY": 150.2, "EUR": 0.92, "GBP": 0.79, "CHF": 0.88, "AUD": 1.52, "CAD": 1.36, "NZD": 1.66}
+HTML_SOURCES = {"Investing.com", "TradingView", "AlphaQuery", "X-Rates"}      # web pages, never parse
+
+
+def free_source_profiles(sources: list, delay: float = 0.08, jitter: float = 0.15,
+                         error_rate: float = 0.05, seed: int = 7) -> list:
+    """
+    One StubProfile per FREE_SOURCES entry, same name and batch shape: batch
+    providers answer a rate table, templated ones quote any pair, fixed URLs
+    quote USD/JPY, known web pages answer HTML. Each provider's base latency
+    is spread around `delay` (seeded, so runs are comparable).
+    """
+    rng = random.Random(seed)
+    profiles = []
+    for source in sources:
+        name = source["name"]
+        profile = StubProfile(name, delay=delay * rng.uniform(0.5, 2.0), jitter=jitter,
+                              error_rate=error_rate, price=RATES["JPY"], html=name in HTML_SOURCES)
+        if source.get("batch"):
+            profile.rates, profile.batch = RATES, "table"
+        elif "{" in source["url"]:
+            profile.rates = RATES
+        profiles.append(profile)
+    return profiles
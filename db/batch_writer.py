@@ -0,0 +1,178 @@
+# db/batch_writer.py
+# Background, batched database writes.
+# Callers hand rows to a BatchWriter and return immediately; a background task
+# collects them from a bounded queue and writes them in batches, either when
+# BATCH_SIZE rows are waiting or every FLUSH_INTERVAL seconds, whichever comes
+# first. On shutdown, stop() writes whatever is still queued. A batch rejected
+# for a bad row (e.g. a user_id with no ai05_users row) is retried row by row,
+# so only the bad rows are dropped.
+# chat_log_writer is the shared writer for ai05_chat_logs, used by the API, the
+# scheduler and main.py; db/quote_store.py has the one for ai05_quotes.
+
+import os
+import asyncio
+from datetime import datetime
+
+from asyncpg.exceptions import IntegrityConstraintViolationError, DataError as PgDataError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError, DataError
+
+from .mydatabase import engine, ChatLogAI05
+from myagents.metrics import db_write_seconds, db_rows_written
+
+# === Config (overridable from .env) ===
+BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", "500"))
+FLUSH_INTERVAL = float(os.getenv("DB_FLUSH_INTERVAL", "1.0"))     # seconds
+QUEUE_SIZE = int(os.getenv("DB_QUEUE_SIZE", "10000"))             # rows buffered before new ones are dropped
+
+
+def _bad_row(e: Exception) -> bool:
+    """The batch was rejected for its data (constraint, type) rather than because the database failed."""
+    return isinstance(e, (IntegrityError, DataError, IntegrityConstraintViolationError, PgDataError))
+
+
+class BatchWriter:
+    def __init__(self, name: str, write_batch, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL, queue_size: int = QUEUE_SIZE):
+        self.name = name
+        self.write_batch = write_batch          # async (rows: list[dict]) -> None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: asyncio.Task | None = None
+        self._pending: list = []
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def submit(self, row: dict) -> bool:
+        """Queue a row without waiting. Returns False (and counts a drop) if the queue is full."""
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and write everything still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        pending, self._pending = self._pending, []
+        await self._flush(pending)
+        while not self._queue.empty():
+            await self._flush(self._take(self.batch_size))
+
+    def _take(self, limit: int) -> list:
+        rows = []
+        while len(rows) < limit and not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        return rows
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        rows = []
+        try:
+            while True:
+                rows.append(await self._queue.get())
+                deadline = loop.time() + self.flush_interval
+                while len(rows) < self.batch_size:
+                    rows.extend(self._take(self.batch_size - len(rows)))
+                    remaining = deadline - loop.time()
+                    if len(rows) >= self.batch_size or remaining <= 0:
+                        break
+                    try:
+                        rows.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                await self._flush(rows)
+                rows = []
+        finally:
+            # Rows taken from the queue but not written yet; stop() writes them
+            self._pending = rows
+
+    async def _flush(self, rows: list):
+        if not rows:
+            return
+        try:
+            with db_write_seconds.time(self.name):
+                await self.write_batch(rows)
+            self.written += len(rows)
+            self.batches += 1
+            db_rows_written.inc(len(rows), self.name, "ok")
+        except Exception as e:
+            if len(rows) > 1 and _bad_row(e):
+                return await self._flush_rows(rows)
+            self._failed(rows, e)
+
+    async def _flush_rows(self, rows: list):
+        """Write a rejected batch one row at a time, dropping only the rows that fail."""
+        written = 0
+        for row in rows:
+            try:
+                await self.write_batch([row])
+                written += 1
+            except Exception as e:
+                self._failed([row], e)
+        self.written += written
+        self.batches += 1
+        db_rows_written.inc(written, self.name, "ok")
+
+    def _failed(self, rows: list, e: Exception):
+        self.failed += len(rows)
+        db_rows_written.inc(len(rows), self.name, "failed")
+        print(f"⚠️ Warning: {self.name} failed to write {len(rows)} rows: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+# === Bulk insert (COPY on Postgres, one multi-row INSERT elsewhere) ===
+async def bulk_insert(model, columns: list, rows: list):
+    async with engine.begin() as conn:
+        if engine.dialect.driver == "asyncpg":
+            # COPY is the fastest way to load many rows into Postgres
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                model.__tablename__,
+                records=[tuple(row[column] for column in columns) for row in rows],
+                columns=columns,
+            )
+        else:
+            # One multi-row INSERT ... VALUES (...), (...) statement
+            await conn.execute(insert(model).values(rows))
+
+
+# === ai05_chat_logs ===
+CHAT_LOG_COLUMNS = ["user_id", "agent", "message", "is_ai_response", "created_at"]
+
+
+async def write_chat_logs(rows: list):
+    await bulk_insert(ChatLogAI05, CHAT_LOG_COLUMNS, rows)
+
+
+chat_log_writer = BatchWriter("chat_log_writer", write_chat_logs)
+
+
+def log_chat(message: str, user_id: int = 1, is_ai_response: bool = True, agent: str | None = None) -> bool:
+    """Queue one ai05_chat_logs row; never waits on the database."""
+    return chat_log_writer.submit({
+        "user_id": user_id,
+        "agent": agent,
+        "message": message,
+        "is_ai_response": is_ai_response,
+        "created_at": datetime.utcnow(),
+    })
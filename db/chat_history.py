@@ -0,0 +1,64 @@
+# db/chat_history.py
+# Reading ai05_chat_logs back, newest first, with keyset (cursor) pagination.
+# A page is "rows older than the last one you saw", i.e.
+#   WHERE user_id = ? [AND agent = ?] AND (created_at, id) < (?, ?)
+#   ORDER BY created_at DESC, id DESC LIMIT ?
+# which is a single range scan on the matching ChatLogAI05 index plus a table
+# lookup for each of the `limit` rows returned, so page 1000 costs the same as
+# page 1 (OFFSET would scan and discard every earlier row).
+
+import os
+import base64
+from datetime import datetime
+
+from sqlalchemy import select, tuple_
+
+from .mydatabase import async_session, ChatLogAI05
+
+# === Config (overridable from .env) ===
+CHAT_HISTORY_MAX_LIMIT = int(os.getenv("CHAT_HISTORY_MAX_LIMIT", "200"))
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{row_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """(created_at, id) from a cursor; ValueError if it is malformed."""
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+async def get_chat_logs(user_id: int, agent: str | None = None, cursor: str | None = None,
+                        limit: int = 50) -> dict:
+    """
+    One page of a user's chat history, newest first.
+    Returns {"items": [...], "next_cursor": str | None}; pass next_cursor back
+    to get the following page. None means there are no older rows.
+    """
+    limit = max(1, min(limit, CHAT_HISTORY_MAX_LIMIT))
+    query = select(
+        ChatLogAI05.id, ChatLogAI05.agent, ChatLogAI05.message,
+        ChatLogAI05.is_ai_response, ChatLogAI05.created_at,
+    ).where(ChatLogAI05.user_id == user_id)
+    if agent is not None:
+        query = query.where(ChatLogAI05.agent == agent)
+    if cursor:
+        query = query.where(tuple_(ChatLogAI05.created_at, ChatLogAI05.id) < tuple_(*decode_cursor(cursor)))
+    # One extra row tells us whether there is another page
+    query = query.order_by(ChatLogAI05.created_at.desc(), ChatLogAI05.id.desc()).limit(limit + 1)
+
+    async with async_session() as session:
+        rows = (await session.execute(query)).all()
+
+    page = rows[:limit]
+    items = [
+        {"id": row.id, "agent": row.agent, "message": row.message,
+         "is_ai_response": row.is_ai_response, "created_at": row.created_at.isoformat()}
+        for row in page
+    ]
+    next_cursor = encode_cursor(page[-1].created_at, page[-1].id) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,79 @@
+# db/quote_store.py
+# Quote history in ai05_quotes.
+# Every real quote the FX tools fetch is queued here and written in bulk by a
+# background BatchWriter, so fetching never waits on the database. Charts and
+# indicators read it back with get_recent_quotes, a range scan on the
+# (pair, ts) index. Each fetch stores one row per source, so recent_prices
+# reduces the rows to one price per time bucket (the median of the sources)
+# before anything treats them as a price series.
+
+import os
+import asyncio
+import statistics
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from .mydatabase import async_session, QuoteAI05
+from .batch_writer import BatchWriter, bulk_insert
+
+# === Config (overridable from .env) ===
+QUOTE_HISTORY_LIMIT = int(os.getenv("QUOTE_HISTORY_LIMIT", "1000"))       # rows returned per query at most
+QUOTE_HISTORY_TIMEOUT = float(os.getenv("QUOTE_HISTORY_TIMEOUT", "0.5"))  # seconds before giving up on the DB
+QUOTE_BUCKET_SECONDS = float(os.getenv("QUOTE_BUCKET_SECONDS", "60"))      # one price per bucket in recent_prices
+
+QUOTE_COLUMNS = ["pair", "source", "ts", "price"]
+
+
+async def write_quotes(rows: list):
+    await bulk_insert(QuoteAI05, QUOTE_COLUMNS, rows)
+
+
+quote_writer = BatchWriter("quote_writer", write_quotes)
+
+
+def record_quote(pair: str, source: str, price: float, ts: datetime | None = None) -> bool:
+    """Queue one quote for ai05_quotes; never waits on the database."""
+    return quote_writer.submit({"pair": pair, "source": source, "ts": ts or datetime.utcnow(), "price": float(price)})
+
+
+async def get_recent_quotes(pair: str, minutes: float = 60, source: str | None = None,
+                            limit: int = QUOTE_HISTORY_LIMIT) -> list:
+    """
+    Quotes for `pair` from the last `minutes`, oldest first, as
+    [{"ts", "source", "price"}]. At most `limit` rows (the newest ones).
+    """
+    since = datetime.utcnow() - timedelta(minutes=minutes)
+    query = (
+        select(QuoteAI05.ts, QuoteAI05.source, QuoteAI05.price)
+        .where(QuoteAI05.pair == pair, QuoteAI05.ts >= since)
+        .order_by(QuoteAI05.ts.desc())
+        .limit(limit)
+    )
+    if source is not None:
+        query = query.where(QuoteAI05.source == source)
+    async with async_session() as session:
+        rows = (await session.execute(query)).all()
+    return [{"ts": ts, "source": src, "price": price} for ts, src, price in reversed(rows)]
+
+
+def bucket_prices(quotes: list, seconds: float = QUOTE_BUCKET_SECONDS) -> list:
+    """One price per `seconds` of time, oldest first: the median of the quotes in that bucket."""
+    buckets = {}
+    for quote in quotes:
+        buckets.setdefault(int(quote["ts"].timestamp() // seconds), []).append(quote["price"])
+    return [statistics.median(prices) for _, prices in sorted(buckets.items())]
+
+
+async def recent_prices(pair: str, minutes: float = 60) -> list:
+    """
+    Price series for charts and indicators: get_recent_quotes reduced by
+    bucket_prices, or [] when there is no history or the database does not
+    answer within QUOTE_HISTORY_TIMEOUT.
+    """
+    try:
+        quotes = await asyncio.wait_for(get_recent_quotes(pair, minutes), QUOTE_HISTORY_TIMEOUT)
+    except Exception as e:
+        print(f"⚠️ Warning: no quote history for {pair}: {e}")
+        return []
+    return bucket_prices(quotes)
@@ -81,13 +81,15 @@ from myagents.quantedge_agent import run_agent as run_quantedge
 
 
 # ------------------------------------------------------------------
-# 4.  HELPER — SAVE TO DB
+# 4.  HELPER — SAVE TO DB (queued; written in batches by db/batch_writer.py)
 # ------------------------------------------------------------------
-async def save_chat(message: str, user_id: int = 1):
-    async with async_session() as session:
-        log = ChatLogAI05(user_id=user_id, message=message, is_ai_response=True)
-        session.add(log)
-        await session.commit()
+from db.batch_writer import chat_log_writer, log_chat
+from db.quote_store import quote_writer
+from db.mydatabase import create_tables as create_db_tables
+
+
+def save_chat(message: str, user_id: int = 1, agent: str | None = None):
+    log_chat(message, user_id=user_id, agent=agent)
 
 
 # ------------------------------------------------------------------
@@ -95,7 +97,10 @@ async def save_chat(message: str, user_id: int = 1):
 # ------------------------------------------------------------------
 async def main():
     await create_tables()
+    await create_db_tables()        # ai05_quotes, and the agent column + indexes on ai05_chat_logs
     await ensure_default_user()
+    chat_log_writer.start()
+    quote_writer.start()
 
     agents_prompts = [
         ("AtlasFX", run_atlasfx, "What’s the FX summary for USD/JPY?"),
@@ -109,7 +114,11 @@ async def main():
         print(f"🟦 Running {name} Agent...")
         result = await runner(prompt)
         print(f"Result from {name}:\n{result}\n")
-        await save_chat(f"[{name}] {result}")
+        save_chat(f"[{name}] {result}", agent=name)
+
+    # Write whatever is still queued before the process exits
+    await chat_log_writer.stop()
+    await quote_writer.stop()
 
 
 # ------------------------------------------------------------------
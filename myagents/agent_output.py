@@ -0,0 +1,48 @@
+# myagents/agent_output.py
+# Turns an agent's final text into what the API returns: the summary, plus
+# chart URLs and <img> tags for any "ChartData: {...}" block at the end.
+# Shared by api.py and scheduler.py.
+
+import os
+import json
+
+from .lazy_charts import register_chart
+from db.quote_store import recent_prices
+
+# === Config (overridable from .env) ===
+CHART_HISTORY_MINUTES = float(os.getenv("CHART_HISTORY_MINUTES", "240"))    # price history drawn on each chart
+
+
+# === Split an agent's response into summary + chart URLs + HTML img tags ===
+async def parse_agent_output(response_text: str) -> dict:
+    summary = response_text
+    chart_urls = []
+    chart_imgs = []  # HTML <img> tags for direct display
+
+    try:
+        if "ChartData:" in response_text:
+            summary_part, chart_json_part = response_text.split("ChartData:", 1)
+            summary = summary_part.strip()
+            chart_data = json.loads(chart_json_part.strip())
+
+            if "chart_data" in chart_data:
+                histories = {}      # pair -> recent prices from ai05_quotes, loaded once per pair
+                for entry in chart_data["chart_data"]:
+                    if entry["pair"] not in histories:
+                        histories[entry["pair"]] = await recent_prices(entry["pair"], CHART_HISTORY_MINUTES)
+                    # Content-addressed URL (the history is part of the key); the PNG is rendered on first fetch
+                    url = register_chart(entry["pair"], entry["price"], entry.get("source", "Simulated"),
+                                         histories[entry["pair"]])
+                    chart_urls.append(url)
+
+                    # HTML <img> tag for direct display
+                    chart_imgs.append(f'<img src="{url}" alt="{entry["pair"]} Chart">')
+
+    except Exception as e:
+        print(f"⚠️ Warning: Failed to generate chart URLs: {e}")
+
+    return {
+        "summary": summary,
+        "chart_urls": chart_urls,
+        "chart_imgs": chart_imgs  # new field for direct HTML display
+    }
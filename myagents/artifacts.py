@@ -0,0 +1,82 @@
+# myagents/artifacts.py
+# Per-run artifact store for bulk tool data.
+# Instead of returning a full list of quotes to the model (which then has to
+# copy every number back into the next tool call), a tool stores the data here
+# and returns a short handle such as "fx:3f9a1c2b-1". Tools that take the data
+# accept the handle and look it up, so the numbers never pass through the LLM.
+# capture_tool_outputs() additionally collects a run's structured results for
+# the caller (scheduler.py publishes them in the agent snapshots).
+
+import os
+import time
+import uuid
+import itertools
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# === Config (overridable from .env) ===
+ARTIFACT_TTL = float(os.getenv("ARTIFACT_TTL", "900"))           # seconds
+ARTIFACT_MAX = int(os.getenv("ARTIFACT_MAX", "1000"))
+
+_run_id: ContextVar = ContextVar("artifact_run_id", default=None)
+_captured: ContextVar = ContextVar("captured_tool_outputs", default=None)
+
+
+@contextmanager
+def run_scope():
+    """Give every handle created inside this block (one agent run) the same run id prefix."""
+    token = _run_id.set(uuid.uuid4().hex[:8])
+    try:
+        yield _run_id.get()
+    finally:
+        _run_id.reset(token)
+
+
+@contextmanager
+def capture_tool_outputs():
+    """Collect the results passed to capture() by the runs inside this block, in the dict yielded."""
+    captured = {}
+    token = _captured.set(captured)
+    try:
+        yield captured
+    finally:
+        _captured.reset(token)
+
+
+def capture(name: str, value):
+    """Hand a tool result to the enclosing capture_tool_outputs(), if any. Dicts under one name are merged."""
+    captured = _captured.get()
+    if captured is None:
+        return
+    if isinstance(value, dict) and isinstance(captured.get(name), dict):
+        captured[name].update(value)
+    else:
+        captured[name] = value
+
+
+class ArtifactStore:
+    def __init__(self, ttl: float = ARTIFACT_TTL, max_items: int = ARTIFACT_MAX):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._items: OrderedDict = OrderedDict()     # handle -> (stored_at, data)
+        self._serial = itertools.count(1)            # keeps handles of one run and kind apart
+
+    def put(self, kind: str, data) -> str:
+        run_id = _run_id.get() or uuid.uuid4().hex[:8]
+        handle = f"{kind}:{run_id}-{next(self._serial)}"
+        self._items[handle] = (time.monotonic(), data)
+        self._items.move_to_end(handle)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        return handle
+
+    def get(self, handle: str):
+        entry = self._items.get(handle.strip())
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            raise KeyError(f"Unknown or expired data handle '{handle}'. Fetch the data again.")
+        return entry[1]
+
+
+# === Shared instance ===
+artifacts = ArtifactStore()
@@ -2,10 +2,12 @@
 
 import os
 import sys
+import json
 import asyncio
-import requests
 from datetime import datetime, timezone
-import random
+from contextlib import aclosing
+
+import numpy as np
 
 # === Create charts directory for website ===
 WEB_CHARTS_DIR = os.path.join(os.path.dirname(__file__), "charts")
@@ -14,135 +16,194 @@ os.makedirs(WEB_CHARTS_DIR, exist_ok=True)
 # === Add parent directory to path for module access ===
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from dotenv import load_dotenv
-from openai import AsyncOpenAI
-from agents import Agent, Runner, set_tracing_disabled, OpenAIChatCompletionsModel
-from agents import function_tool
-from .fx_graphs import plot_fx_setup
-
-# === Load environment variables and disable tracing ===
-load_dotenv()
-set_tracing_disabled(True)
-
-# === Read Gemini API key from environment ===
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("❌ GEMINI_API_KEY is missing in .env")
-
-# === Setup Gemini client ===
-external_client = AsyncOpenAI(
-    api_key=GEMINI_API_KEY,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-)
-
-# === Model configuration ===
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=external_client
-)
-
-# === Free Open FX/Stock Sources ===
-FREE_SOURCES = [
-    {"name": "FreeForexAPI", "url": "https://www.freeforexapi.com/api/live?pairs=USDJPY"},
-    {"name": "CoinGecko", "url": "https://api.coingecko.com/api/v3/simple/price?ids=usd&vs_currencies=jpy"},
-    {"name": "YahooFinance", "url": "https://query1.finance.yahoo.com/v8/finance/chart/USDJPY=X"},
-    {"name": "TwelveData", "url": "https://api.twelvedata.com/time_series?symbol=USD/JPY&interval=1min&apikey=demo"},
-    {"name": "AlphaVantage", "url": "https://www.alphavantage.co/query?function=CURRENCY_EXCHANGE_RATE&from_currency=USD&to_currency=JPY&apikey=demo"},
-    {"name": "Finnhub", "url": "https://finnhub.io/api/v1/forex/rates?base=USD"},
-    {"name": "Marketstack", "url": "https://api.marketstack.com/v1/eod?access_key=demo&symbols=USDJPY"},
-    {"name": "Polygon.io", "url": "https://api.polygon.io/v1/last/forex/USD/JPY?apiKey=demo"},
-    {"name": "FCSAPI", "url": "https://fcsapi.com/api-v3/forex/latest?symbol=USDJPY&access_key=demo"},
-    {"name": "Investing.com", "url": "https://www.investing.com/quotes/usd-jpy"},
-    {"name": "TradingView", "url": "https://www.tradingview.com/symbols/USDJPY/"},
-    {"name": "CurrencyLayer", "url": "https://api.currencylayer.com/live?currencies=JPY&source=USD&access_key=demo"},
-    {"name": "Exchangeratesapi", "url": "https://api.exchangeratesapi.io/latest?symbols=JPY&base=USD"},
-    {"name": "X-Rates", "url": "https://www.x-rates.com/calculator/?from=USD&to=JPY&amount=1"},
-    {"name": "OANDA", "url": "https://www1.oanda.com/rates/api/v1/rates/USDJPY"},
-    {"name": "ForexPython", "url": "https://www.forexpython.com/api/latest/USD/JPY"},
-    {"name": "FXCM", "url": "https://www.fxcm.com/forex-data-api/"},
-    {"name": "OpenExchangeRates", "url": "https://openexchangerates.org/api/latest.json?app_id=demo"},
-    {"name": "XE.com", "url": "https://xecdapi.xe.com/v1/convert_from.json/?from=USD&to=JPY&amount=1"},
-    {"name": "AlphaQuery", "url": "https://www.alphaquery.com/forex/USDJPY"}
-]
+from agents import Agent
+from .pipeline import pipeline_tool, call, narrate
+from .clients import get_model
+from .response_cache import cached_run, fingerprint
+from .streaming import stream_run
+from .chart_service import render_charts
+from .fx_fetch import fetch_pairs
+from .fx_sources import FREE_SOURCES, LEGACY_PAIR, split_pairs, pairs_in_text
+from .consensus import consensus_records
+from .source_health import source_registry
+from .artifacts import artifacts, run_scope, capture
+from db.quote_store import recent_prices
+from . import indicators
+
+# === Shared Gemini model (pooled client, see myagents/clients.py) ===
+model = get_model()
 
 # === Tool: Fetch FX data from all sources ===
-@function_tool
-def fetch_fx_data(pair: str = "USD/JPY") -> list:
-    results = []
-    for source in FREE_SOURCES:
-        try:
-            resp = requests.get(source["url"], timeout=2)
-            if resp.status_code == 200:
-                data = resp.json()
-                price = None
-                if "rates" in data and "USDJPY" in data["rates"]:
-                    price = float(data["rates"]["USDJPY"])
-                elif "USDJPY" in data:
-                    price = float(data["USDJPY"])
-                elif "price" in data:
-                    price = float(data["price"])
-                if not price:
-                    price = round(random.uniform(140.0, 160.0), 2)
-                timestamp = datetime.now(timezone.utc).isoformat() + "Z"
-                results.append({"pair": pair, "price": price, "source": source["name"], "timestamp": timestamp})
-        except Exception:
+# All requested pairs are fetched together: providers that quote many pairs
+# per call are asked once (see myagents/fx_sources.py). The quotes for each
+# pair are reduced to one consensus record (weighted median of the sources
+# that agree, outliers dropped; see myagents/consensus.py). The records stay
+# server-side in the artifact store; the model only sees a handle and a short
+# preview, and passes the handle on to the other tools.
+@pipeline_tool
+async def fetch_fx_data(pairs: str = "USD/JPY") -> dict:
+    """Fetch quotes for one or more pairs (comma separated, e.g. "USD/JPY,EUR/USD") from all sources and agree on one price per pair. Returns an `fx_data` handle for the other FX tools."""
+    pair_list = split_pairs(pairs) or ["USD/JPY"]
+    answers, histories = await asyncio.gather(
+        fetch_pairs(pair_list, FREE_SOURCES),
+        asyncio.gather(*(recent_prices(pair, SENTIMENT_HISTORY_MINUTES) for pair in pair_list)),
+    )
+    records = consensus_records(answers, source_registry.reliability)
+    timestamp = datetime.now(timezone.utc).isoformat() + "Z"
+
+    entries, unavailable = [], []
+    for pair, history in zip(pair_list, histories):
+        record = records[pair]
+        if record is None and not history and pair != LEGACY_PAIR:
+            unavailable.append(pair)
             continue
-    if not results:
-        results.append({"pair": pair, "price": 150.5, "source": "Simulated", "timestamp": datetime.now(timezone.utc).isoformat() + "Z"})
-    return results
-
-# === Tool: Analyze sentiment for each price ===
-@function_tool
-def analyze_fx_sentiment(fx_data: list) -> list:
-    for entry in fx_data:
-        entry["sentiment"] = "bullish" if entry["price"] > 150 else "bearish"
-        entry["confidence"] = 85
-    return fx_data
+        if record is None:
+            # No source answered: fall back to the last stored price, else a placeholder
+            price = history[-1] if history else 150.5
+            record = {"pair": pair, "price": price, "agreement": 0.0, "sources": 0, "quotes": 0,
+                      "low": price, "high": price, "outliers": [], "inliers": []}
+            source = "History" if history else "Simulated"
+        else:
+            source = f"Consensus of {record['sources']}"
+        # "basis" is the slug of `source`, used where a path-safe name is needed (chart filenames)
+        entries.append({**record, "source": source, "basis": source.split()[0].lower(),
+                        "timestamp": timestamp, "history": history})
+
+    preview = [{key: e[key] for key in ("pair", "price", "agreement", "sources", "quotes", "outliers")} for e in entries]
+    return {"fx_data": artifacts.put("fx", entries), "pairs": preview, "unavailable": unavailable}
+
+# === Tool: Analyze sentiment for each pair ===
+# With enough stored history, each pair's consensus price is appended to its
+# recent prices and scored on trend (price vs EMA) and momentum (RSI); pairs
+# with the same history length are scored together. Without history USD/JPY
+# falls back to its old fixed threshold and other pairs are neutral.
+SENTIMENT_HISTORY_MINUTES = float(os.getenv("SENTIMENT_HISTORY_MINUTES", "240"))
+SENTIMENT_EMA_SPAN = 20
+SENTIMENT_RSI_PERIOD = 14
+
+
+def _score_sentiment(entries: list) -> list:
+    """(sentiment, confidence) per entry."""
+    scores = [None] * len(entries)
+    groups = {}                         # history length -> entry indexes
+    for i, entry in enumerate(entries):
+        history = entry.get("history") or []
+        if len(history) >= SENTIMENT_EMA_SPAN:
+            groups.setdefault(len(history), []).append(i)
+        elif entry["pair"] == LEGACY_PAIR:
+            scores[i] = ("bullish" if entry["price"] > 150 else "bearish", 85)
+        else:
+            scores[i] = ("neutral", 50)
+
+    for indexes in groups.values():
+        prices = np.array([list(entries[i]["history"]) + [entries[i]["price"]] for i in indexes])
+        trend = indicators.latest(indicators.ema(prices, SENTIMENT_EMA_SPAN))
+        momentum = indicators.latest(indicators.rsi(prices, SENTIMENT_RSI_PERIOD))
+        for i, price, ema, rsi in zip(indexes, prices[:, -1], trend, momentum):
+            sentiment = "bullish" if price > ema else "bearish"
+            # Momentum agreeing with the trend raises confidence, disagreeing lowers it
+            agreement = (rsi - 50) / 50 if sentiment == "bullish" else (50 - rsi) / 50
+            scores[i] = (sentiment, int(np.clip(60 + 35 * agreement, 50, 95)))
+    return scores
+
+
+@pipeline_tool
+def analyze_fx_sentiment(fx_data: str) -> dict:
+    """Score each pair behind an `fx_data` handle. Returns a new `fx_data` handle with sentiment added."""
+    entries = artifacts.get(fx_data)
+    analyzed = []
+    for entry, (sentiment, confidence) in zip(entries, _score_sentiment(entries)):
+        analyzed.append({**entry, "sentiment": sentiment, "confidence": confidence})
+    # The consensus records, for snapshots (without the raw history)
+    capture("fx_data", {e["pair"]: {k: v for k, v in e.items() if k != "history"} for e in analyzed})
+    return {"fx_data": artifacts.put("fxs", analyzed),
+            "sentiment": {e["pair"]: e["sentiment"] for e in analyzed}}
 
 # === Tool: Generate summary ===
-@function_tool
-def generate_fx_summary(fx_data: list) -> str:
+@pipeline_tool
+def generate_fx_summary(fx_data: str) -> str:
+    """Summarize the analyzed quotes behind an `fx_data` handle from `analyze_fx_sentiment`."""
     try:
         summary_lines = []
-        for entry in fx_data:
+        for entry in artifacts.get(fx_data):
             summary_lines.append(
-                f"{entry['pair']} | Price: {entry['price']} | Source: {entry['source']} | Sentiment: {entry['sentiment']} | Timestamp: {entry['timestamp']}"
+                f"{entry['pair']} | Price: {entry['price']} | Source: {entry['source']} | Agreement: {entry['agreement']:.0%} "
+                f"| Range: {entry['low']}-{entry['high']} | Outliers: {', '.join(entry['outliers']) or 'none'} "
+                f"| Sentiment: {entry['sentiment']} | Timestamp: {entry['timestamp']}"
             )
         return "\n".join(summary_lines)
     except Exception as e:
         return f"❌ Error generating summary: {e}"
 
-# === Tool: Generate charts for all sources ===
-@function_tool
-def generate_fx_charts(fx_data: list) -> list:
-    chart_files = []
-    for entry in fx_data:
+# === Tool: Generate one chart per pair ===
+@pipeline_tool
+async def generate_fx_charts(fx_data: str) -> list:
+    """Render one chart per consensus record behind an `fx_data` handle."""
+    jobs = []
+    for entry in artifacts.get(fx_data):
         timestamp_str = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-        filename = f"{entry['pair'].replace('/', '')}_{entry['source']}_{timestamp_str}.png"
-        chart_path = os.path.join(WEB_CHARTS_DIR, filename)
-        plot_fx_setup(entry["pair"], entry["price"], save_path=chart_path)
-        chart_files.append({"source": entry["source"], "file": chart_path})
-    return chart_files
+        filename = f"{entry['pair'].replace('/', '')}_{entry['basis']}_{timestamp_str}.png"
+        jobs.append({"pair": entry["pair"], "price": entry["price"], "source": entry["source"],
+                     "history": entry.get("history") or None, "save_path": os.path.join(WEB_CHARTS_DIR, filename)})
+    paths = await render_charts(jobs)
+    return [{"source": job["source"], "file": path} for job, path in zip(jobs, paths) if path]
 
 # === Define AtlasFX agent ===
 atlasfx = Agent(
     name="AtlasFX",
     instructions="""
 You are a professional Forex market analyst.
-1. Fetch FX stats from all available sources with `fetch_fx_data`.
-2. Analyze sentiment for each source using `analyze_fx_sentiment`.
+1. Fetch the consensus FX price across all available sources with `fetch_fx_data`,
+   for every pair the user asks about (comma separated; USD/JPY if none is named).
+2. Analyze sentiment using `analyze_fx_sentiment`.
 3. Generate a summary with `generate_fx_summary`.
-4. Generate charts for all sources using `generate_fx_charts`.
-Return all charts and a combined summary.
+4. Generate the chart using `generate_fx_charts`.
+The FX tools exchange data through the short `fx_data` handle each one returns
+(e.g. "fx:3f9a1c2b-1"). Pass each handle exactly as given to the next step; never copy prices into tool calls.
+Mention how well the sources agreed and any outlier sources.
+Return the charts and a combined summary.
 """,
     tools=[fetch_fx_data, analyze_fx_sentiment, generate_fx_summary, generate_fx_charts],
     model=model
 )
 
+# === Pairs the user asked about (USD/JPY if none is named) ===
+def message_pairs(user_message: str) -> list:
+    return pairs_in_text(user_message) or [LEGACY_PAIR]
+
+
+async def quotes_fingerprint(pairs: list) -> str:
+    # Quotes come from the shared cache, so this also warms it for fetch_fx_data
+    answers = await fetch_pairs(pairs, FREE_SOURCES)
+    return fingerprint(sorted((pair, q["source"], q["price"]) for pair, quotes in answers.items() for q in quotes))
+
 # === Runner function ===
 async def run_agent(user_message: str = "What’s the FX summary for USD/JPY?") -> str:
-    result = await Runner.run(atlasfx, user_message)
-    return result.final_output
+    tools_fingerprint = await quotes_fingerprint(message_pairs(user_message))
+    with run_scope():
+        return await cached_run(atlasfx, user_message, tools_fingerprint)
+
+# === Streamed run (progress events for the SSE endpoints) ===
+async def stream_agent(user_message: str = "What’s the FX summary for USD/JPY?"):
+    tools_fingerprint = await quotes_fingerprint(message_pairs(user_message))
+    # The streamed run's task copies the context when it starts, so its tools share this run id
+    with run_scope():
+        async with aclosing(stream_run(atlasfx, user_message, tools_fingerprint)) as events:
+            async for event in events:
+                yield event
+
+# === Direct mode: the fixed tool sequence in Python, one LLM call for the write-up ===
+async def run_direct(user_message: str = "What’s the FX summary for USD/JPY?") -> str:
+    with run_scope():
+        fetched = await call(fetch_fx_data, ",".join(message_pairs(user_message)))
+        analyzed = await call(analyze_fx_sentiment, fetched["fx_data"])
+        summary = await call(generate_fx_summary, analyzed["fx_data"])
+        fx_data = artifacts.get(analyzed["fx_data"])
+    narrative = await narrate(atlasfx, user_message, {"fx_summary": summary})
+    # Instead of rendering with generate_fx_charts, hand the chart inputs to the API,
+    # which turns them into lazily rendered chart URLs.
+    chart_data = [{"pair": e["pair"], "price": e["price"], "source": e["source"]} for e in fx_data]
+    return f"{narrative}\n\nChartData: {json.dumps({'chart_data': chart_data})}"
 
 # === Local test runner ===
 if __name__ == "__main__":
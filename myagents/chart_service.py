@@ -0,0 +1,106 @@
+# myagents/chart_service.py
+# Chart rendering off the event loop.
+# matplotlib renders are CPU bound (hundreds of ms per 150-dpi savefig), so
+# they run in a bounded process pool and callers just await the result.
+# If a worker dies (OOM kill, crash) the pool is broken for good, so it is
+# replaced and the job retried once on the new pool.
+
+import os
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .fx_graphs import plot_fx_batch, render_fx_png
+from .metrics import chart_render_seconds
+from .profiler import active_profile, sample_chart_job
+
+# === Config (overridable from .env) ===
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: never fork a process that already runs an event loop and threads
+        _pool = ProcessPoolExecutor(max_workers=CHART_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _replace_broken(pool: ProcessPoolExecutor):
+    global _pool
+    if _pool is pool:           # not already replaced by another caller
+        _pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        print("⚠️ Warning: a chart worker died, starting a new chart pool")
+
+
+async def _run_in_pool(func, *args):
+    """func(*args) in the pool; on a broken pool, retried once on a fresh one."""
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    try:
+        return await loop.run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        _replace_broken(pool)
+        return await loop.run_in_executor(get_pool(), func, *args)
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+# === Worker side (runs in the pool) ===
+# profile_id: set while the submitting request is being profiled (myagents/profiler.py)
+def _render_chunk(jobs: list, profile_id: str | None = None) -> list:
+    return sample_chart_job(profile_id, plot_fx_batch, jobs)
+
+
+def _render_png_job(job: dict, profile_id: str | None = None) -> bytes:
+    return sample_chart_job(profile_id, lambda: render_fx_png(
+        job["pair"], job["price"], source=job.get("source", "Simulated"), history=job.get("history")))
+
+
+# === Caller side ===
+async def render_charts(jobs: list) -> list:
+    """
+    Render a batch of chart jobs in parallel across the pool.
+    Each job is {"pair", "price", "source"?, "levels"?, "history"?, "save_path"?}. Jobs are
+    split into one chunk per worker and each chunk reuses a single figure.
+    Returns the saved path for each job, or None where that render failed.
+    """
+    if not jobs:
+        return []
+    size = -(-len(jobs) // CHART_WORKERS)
+    chunks = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+
+    profile_id = active_profile()
+
+    async def _timed_chunk(chunk):
+        started = time.perf_counter()
+        try:
+            return await _run_in_pool(_render_chunk, chunk, profile_id)
+        finally:
+            chart_render_seconds.observe((time.perf_counter() - started) / len(chunk), "batch", count=len(chunk))
+
+    results = await asyncio.gather(*(_timed_chunk(chunk) for chunk in chunks), return_exceptions=True)
+    paths = []
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, BaseException):
+            print(f"⚠️ Warning: chart render failed for {len(chunk)} chart(s), first {chunk[0].get('pair')} ({chunk[0].get('source')}): {result}")
+            paths.extend([None] * len(chunk))
+        else:
+            paths.extend(result)
+    return paths
+
+
+async def render_png(job: dict) -> bytes:
+    """Render one chart job in the pool and return the PNG bytes."""
+    with chart_render_seconds.time("png"):
+        return await _run_in_pool(_render_png_job, job, active_profile())
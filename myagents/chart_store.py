@@ -0,0 +1,125 @@
+# myagents/chart_store.py
+# Size- and age-bounded file store for rendered charts (myagents/charts/).
+# Writes are atomic (temp file + rename) so a reader never sees a half-written
+# PNG, and a periodic garbage collection removes files past CHART_STORE_MAX_AGE
+# and then least-recently-used files until the directory fits CHART_STORE_MAX_BYTES.
+
+import os
+import time
+import asyncio
+import tempfile
+
+# === Config (overridable from .env) ===
+CHART_STORE_MAX_BYTES = int(os.getenv("CHART_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+CHART_STORE_MAX_AGE = float(os.getenv("CHART_STORE_MAX_AGE", str(7 * 24 * 3600)))     # seconds
+CHART_GC_INTERVAL = float(os.getenv("CHART_GC_INTERVAL", "600"))                     # seconds
+
+TMP_PREFIX = ".tmp-"
+TMP_MAX_AGE = 3600          # leftovers from crashed writers
+
+
+def atomic_write_bytes(path: str, data: bytes) -> str:
+    """Write `data` to `path` via a temp file in the same directory and an atomic rename."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=TMP_PREFIX, suffix=".part", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return path
+
+
+class BoundedFileStore:
+    def __init__(self, directory: str, max_bytes: int, max_age: float):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.removed = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, os.path.basename(name))
+
+    def write(self, name: str, data: bytes) -> str:
+        return atomic_write_bytes(self.path(name), data)
+
+    def read(self, name: str) -> bytes | None:
+        path = self.path(name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            st = os.stat(path)
+            os.utime(path, (time.time(), st.st_mtime))     # bump access time for LRU, keep age
+            return data
+        except OSError:
+            return None
+
+    # === Garbage collection ===
+    def collect(self) -> int:
+        """Apply the age limit, then evict least-recently-used files down to max_bytes."""
+        now = time.time()
+        files, removed = [], 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if entry.name.startswith(TMP_PREFIX):
+                    if now - st.st_mtime > TMP_MAX_AGE:
+                        removed += self._unlink(entry.path)
+                    continue
+                if self.max_age and now - st.st_mtime > self.max_age:
+                    removed += self._unlink(entry.path)
+                    continue
+                files.append((max(st.st_atime, st.st_mtime), st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        if self.max_bytes and total > self.max_bytes:
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                if self._unlink(path):
+                    total -= size
+                    removed += 1
+        self.removed += removed
+        return removed
+
+    def _unlink(self, path: str) -> int:
+        try:
+            os.unlink(path)
+            return 1
+        except OSError:
+            return 0
+
+    async def run_gc(self, interval: float = CHART_GC_INTERVAL):
+        """Background loop: collect every `interval` seconds without blocking the event loop."""
+        while True:
+            try:
+                await asyncio.to_thread(self.collect)
+            except Exception as e:
+                print(f"⚠️ Warning: chart store GC failed: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        count, size = 0, 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.startswith(TMP_PREFIX):
+                    count += 1
+                    size += entry.stat().st_size
+        return {"files": count, "bytes": size, "max_bytes": self.max_bytes,
+                "max_age": self.max_age, "removed": self.removed}
+
+
+# === Shared instance for myagents/charts/ ===
+CHARTS_DIR = os.path.join(os.path.dirname(__file__), "charts")
+chart_store = BoundedFileStore(CHARTS_DIR, CHART_STORE_MAX_BYTES, CHART_STORE_MAX_AGE)
@@ -0,0 +1,119 @@
+# myagents/clients.py
+# One place for the network clients shared by every agent:
+# - a single AsyncOpenAI client (and chat-completions model) for the
+#   Gemini-compatible endpoint, on its own tuned connection pool
+#   (set_model swaps in another model, e.g. the offline benchmark fakes)
+# - a single httpx.AsyncClient for market-data HTTP
+# .env is loaded and tracing disabled once here instead of in each agent module.
+
+import os
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from agents import OpenAIChatCompletionsModel, set_tracing_disabled
+
+# === Load environment variables and disable tracing ===
+load_dotenv()
+set_tracing_disabled(True)
+
+# === Read Gemini API key from environment (checked when the LLM client is first built) ===
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+# === Config (overridable from .env) ===
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", os.getenv("FX_MAX_CONNECTIONS", "50")))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", os.getenv("FX_SOURCE_TIMEOUT", "2.0")))
+
+_llm_client: AsyncOpenAI | None = None
+_model: OpenAIChatCompletionsModel | None = None
+_http_client: httpx.AsyncClient | None = None
+
+
+# === Gemini (OpenAI-compatible) ===
+def get_llm_client() -> AsyncOpenAI:
+    global _llm_client
+    if _llm_client is None:
+        if not GEMINI_API_KEY:
+            raise ValueError("❌ GEMINI_API_KEY is missing in .env")
+        _llm_client = AsyncOpenAI(
+            api_key=GEMINI_API_KEY,
+            base_url=GEMINI_BASE_URL,
+            http_client=DefaultAsyncHttpxClient(
+                timeout=LLM_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                    keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+                ),
+            ),
+        )
+    return _llm_client
+
+
+class SharedClientModel(OpenAIChatCompletionsModel):
+    """
+    Chat-completions model that always calls through the current shared client.
+    Agents keep the model they got at import time, so after close_clients() it
+    has to pick up the rebuilt client rather than the closed one.
+    """
+
+    @property
+    def _client(self) -> AsyncOpenAI:
+        return get_llm_client()
+
+    @_client.setter
+    def _client(self, client: AsyncOpenAI):
+        pass                    # set by the base __init__; the shared client is used instead
+
+
+def get_model() -> OpenAIChatCompletionsModel:
+    """The chat-completions model every agent uses."""
+    global _model
+    if _model is None:
+        _model = SharedClientModel(model=GEMINI_MODEL, openai_client=get_llm_client())
+    return _model
+
+
+def set_model(model) -> None:
+    """
+    Use `model` (any agents Model) instead of Gemini, e.g. a scripted or replayed
+    model for offline benchmarks. Agents pick their model up at import time, so
+    call this before the agent modules are imported.
+    """
+    global _model
+    _model = model
+
+
+# === Market-data HTTP ===
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _http_client
+
+
+async def close_clients():
+    """Close the shared clients; the next get_llm_client() / get_http_client() builds new ones."""
+    global _http_client, _llm_client, _model
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    if _llm_client is not None:
+        await _llm_client.close()
+        _llm_client = None
+    if isinstance(_model, SharedClientModel):
+        _model = None           # a model installed with set_model is kept
@@ -0,0 +1,114 @@
+# myagents/consensus.py
+# Cross-source consensus prices.
+# Instead of handing the model one row per source, the quotes for each pair
+# are reduced to a single consensus record:
+# - outliers are rejected with a robust z-score on the median absolute
+#   deviation (MAD) around the median,
+# - the consensus price is the reliability-weighted median of the remaining quotes,
+# - agreement is the weighted share of quotes that survived the filter.
+# All pairs are processed together as one (pairs, sources) array, NaN-padded.
+
+import os
+import warnings
+
+import numpy as np
+
+# === Config (overridable from .env) ===
+CONSENSUS_MAD_K = float(os.getenv("CONSENSUS_MAD_K", "3.5"))            # robust z-score above which a quote is an outlier
+CONSENSUS_MIN_SPREAD = float(os.getenv("CONSENSUS_MIN_SPREAD", "0.0005"))  # relative MAD floor, so identical quotes don't reject a tick
+
+MAD_SCALE = 0.6745          # makes the MAD z-score comparable to a standard z-score for normal data
+
+# Pairs without any quote are all-NaN rows; their results are NaN by design
+warnings.filterwarnings("ignore", "All-NaN slice", RuntimeWarning, module=__name__)
+
+
+def weighted_median(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Row-wise weighted median of a 2-D array; NaN values (or zero weights) are ignored."""
+    weights = np.where(np.isnan(values), 0.0, weights)
+    order = np.argsort(np.where(np.isnan(values), np.inf, values), axis=1)
+    sorted_values = np.take_along_axis(values, order, axis=1)
+    cumulative = np.cumsum(np.take_along_axis(weights, order, axis=1), axis=1)
+    total = cumulative[:, -1:]
+    # First position where the cumulative weight reaches half the total
+    index = np.argmax(cumulative >= total / 2, axis=1)
+    result = np.take_along_axis(sorted_values, index[:, None], axis=1)[:, 0]
+    return np.where(total[:, 0] > 0, result, np.nan)
+
+
+def consensus_prices(prices, weights=None, k: float = CONSENSUS_MAD_K) -> dict:
+    """
+    prices: (pairs, sources) array, NaN where a source has no quote.
+    weights: same shape (or None for equal weights).
+    Returns arrays per pair: price, median, mad, agreement, low, high, count,
+    plus the (pairs, sources) boolean `inlier` mask.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    weights = np.ones_like(prices) if weights is None else np.asarray(weights, dtype=np.float64)
+    valid = ~np.isnan(prices)
+
+    with np.errstate(all="ignore"):
+        median = np.nanmedian(prices, axis=1)
+        deviation = np.abs(prices - median[:, None])
+        mad = np.nanmedian(deviation, axis=1)
+        mad = np.maximum(mad, np.abs(median) * CONSENSUS_MIN_SPREAD)
+        z = MAD_SCALE * deviation / mad[:, None]
+    inlier = valid & (z <= k)
+
+    kept = np.where(inlier, prices, np.nan)
+    valid_weight = np.where(valid, weights, 0.0).sum(axis=1)
+    inlier_weight = np.where(inlier, weights, 0.0).sum(axis=1)
+    with np.errstate(all="ignore"):
+        agreement = np.where(valid_weight > 0, inlier_weight / valid_weight, 0.0)
+        low = np.nanmin(kept, axis=1)
+        high = np.nanmax(kept, axis=1)
+    return {
+        "price": weighted_median(kept, weights),
+        "median": median,
+        "mad": mad,
+        "agreement": agreement,
+        "low": low,
+        "high": high,
+        "count": valid.sum(axis=1),
+        "inlier": inlier,
+    }
+
+
+def consensus_records(quotes_by_pair: dict, weight_of=None) -> dict:
+    """
+    quotes_by_pair: {pair: [{"source", "price"}, ...]} (price None = no quote).
+    weight_of: optional source name -> weight.
+    Returns {pair: record}; a pair without any usable quote maps to None.
+    """
+    pairs = list(quotes_by_pair)
+    width = max((len(q) for q in quotes_by_pair.values()), default=0)
+    prices = np.full((len(pairs), max(width, 1)), np.nan)
+    weights = np.ones_like(prices)
+    for row, pair in enumerate(pairs):
+        for col, quote in enumerate(quotes_by_pair[pair]):
+            if quote.get("price"):
+                prices[row, col] = quote["price"]
+                weights[row, col] = weight_of(quote["source"]) if weight_of else 1.0
+
+    result = consensus_prices(prices, weights)
+    records = {}
+    for row, pair in enumerate(pairs):
+        if result["count"][row] == 0:
+            records[pair] = None
+            continue
+        quotes = quotes_by_pair[pair]
+        inliers = [q["source"] for col, q in enumerate(quotes) if result["inlier"][row, col]]
+        outliers = [q["source"] for col, q in enumerate(quotes)
+                    if not np.isnan(prices[row, col]) and not result["inlier"][row, col]]
+        records[pair] = {
+            "pair": pair,
+            "price": round(float(result["price"][row]), 5),
+            "agreement": round(float(result["agreement"][row]), 3),
+            "sources": len(inliers),
+            "quotes": int(result["count"][row]),
+            "low": round(float(result["low"][row]), 5),
+            "high": round(float(result["high"][row]), 5),
+            "outliers": outliers,
+            "inliers": inliers,
+        }
+    return records
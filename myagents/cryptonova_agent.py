@@ -8,42 +8,37 @@ import random
 # Ensure parent directory is in sys.path for module imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from dotenv import load_dotenv
-from openai import AsyncOpenAI
-from agents import Agent, Runner, set_tracing_disabled, OpenAIChatCompletionsModel
-from agents import function_tool
+from agents import Agent, Runner
+from .pipeline import pipeline_tool, call, call_all, narrate
+from .clients import get_model
+from .response_cache import cached_run, fingerprint
+from .streaming import stream_run
+from .quote_cache import quote_cache, FRESH
 
-# === Load environment variables and disable tracing for cleaner logs ===
-load_dotenv()
-set_tracing_disabled(True)
+# === Shared Gemini model (pooled client, see myagents/clients.py) ===
+model = get_model()
 
-# === Read Gemini API key from environment ===
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("❌ GEMINI_API_KEY is missing in .env")
-
-# === Setup Gemini-compatible OpenAI client ===
-external_client = AsyncOpenAI(
-    api_key=GEMINI_API_KEY,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-)
-
-# === Model configuration ===
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=external_client
-)
+# === Simulated prices, through the shared quote cache so calls within the TTL agree ===
+def current_crypto_prices() -> dict:
+    symbols = ["BTC", "ETH", "SOL", "ADA", "XRP"]
+    prices = {}
+    for sym in symbols:
+        price, state = quote_cache.lookup(("Simulated", f"{sym}/USD"))
+        if state != FRESH:
+            price = round(random.uniform(100, 3000), 2)
+            quote_cache.put(("Simulated", f"{sym}/USD"), price)
+        prices[sym] = price
+    return prices
 
 # === Tool: Fetch simulated cryptocurrency prices ===
-@function_tool
+@pipeline_tool
 def fetch_crypto_data() -> str:
     """Fetch simulated crypto prices for multiple symbols."""
-    symbols = ["BTC", "ETH", "SOL", "ADA", "XRP"]
-    prices = {sym: round(random.uniform(100, 3000), 2) for sym in symbols}
+    prices = current_crypto_prices()
     return "📊 Prices: " + ", ".join([f"{s}: ${p}" for s, p in prices.items()])
 
 # === Tool: Analyze trends based on fetched data ===
-@function_tool
+@pipeline_tool
 def analyze_crypto_trends(data: str = "") -> str:
     """Analyze crypto market trends based on price data."""
     if "BTC" in data and "ETH" in data:
@@ -51,7 +46,7 @@ def analyze_crypto_trends(data: str = "") -> str:
     return "📉 Market trend is currently neutral or mixed."
 
 # === Tool: Summarize trending crypto news ===
-@function_tool
+@pipeline_tool
 def summarize_crypto_news() -> str:
     """Summarize key crypto news headlines."""
     headlines = [
@@ -63,7 +58,7 @@ def summarize_crypto_news() -> str:
     return "📰 Top Crypto News:\n" + "\n".join(f"- {h}" for h in headlines)
 
 # === NEW TOOL: Generate sample crypto price data for charts ===
-@function_tool
+@pipeline_tool
 def generate_crypto_chart_data() -> dict:
     """
     Generate sample OHLC price data for BTC and ETH to be used in charts.
@@ -107,8 +102,27 @@ Format your final response accordingly for easy parsing.
 # === Runner function to call from main.py or API ===
 async def run_agent(user_message: str = "What’s the latest crypto update?") -> str:
     """Run the CryptoNova agent with a user message."""
-    result = await Runner.run(cryptonova, user_message)
-    return result.final_output
+    # The other tools are static, so the current prices identify the tool results
+    return await cached_run(cryptonova, user_message, fingerprint(current_crypto_prices()))
+
+# === Streamed run (progress events for the SSE endpoints) ===
+def stream_agent(user_message: str = "What’s the latest crypto update?"):
+    return stream_run(cryptonova, user_message, fingerprint(current_crypto_prices()))
+
+# === Direct mode: the fixed tool sequence in Python, one LLM call for the write-up ===
+async def run_direct(user_message: str = "What’s the latest crypto update?") -> str:
+    prices = await call(fetch_crypto_data)
+    trends, news, chart_data = await call_all(
+        (analyze_crypto_trends, prices),
+        (summarize_crypto_news,),
+        (generate_crypto_chart_data,),
+    )
+    return await narrate(cryptonova, user_message, {
+        "fetch_crypto_data": prices,
+        "analyze_crypto_trends": trends,
+        "summarize_crypto_news": news,
+        "generate_crypto_chart_data": chart_data,
+    })
 
 # === Local test runner (for development only) ===
 if __name__ == "__main__":
@@ -0,0 +1,282 @@
+# myagents/fx_fetch.py
+# Async fetch engine for the FX sources used by AtlasFX.
+# Requests (planned per provider by myagents/fx_sources.py, so one call can
+# serve many pairs) are sent concurrently on the shared market-data client
+# (myagents/clients.py) and the whole fan-out is bounded by a single overall deadline.
+# Every quote fetch_pairs gets from upstream is also queued for ai05_quotes
+# (db/quote_store.py); quotes served from the cache are not, so the stored
+# history grows with market data, not with request rate.
+
+import os
+import time
+import asyncio
+from datetime import datetime
+
+import httpx
+
+from .clients import get_http_client
+from .quote_cache import quote_cache, MISS, STALE
+from .source_health import source_registry
+from .metrics import source_fetch_seconds
+from .fx_sources import LEGACY_PAIR, plan_requests, build_request, supports, parse_codes
+from db.quote_store import record_quote
+
+# === Config (overridable from .env) ===
+FX_FETCH_DEADLINE = float(os.getenv("FX_FETCH_DEADLINE", "3.0"))           # whole fan-out, seconds
+FX_SOURCE_TIMEOUT = float(os.getenv("FX_SOURCE_TIMEOUT", "2.0"))           # single source, seconds
+FX_QUOTE_TARGET = int(os.getenv("FX_QUOTE_TARGET", "5"))                   # priced quotes wanted per run, 0 = all sources
+FX_MAX_HEDGES = int(os.getenv("FX_MAX_HEDGES", "3"))                       # extra requests allowed per run
+
+# === Single request ===
+async def fetch_source(client: httpx.AsyncClient, source: dict) -> dict | None:
+    """
+    Fetch one source or planned request. Returns {"source", "pairs", "prices",
+    "price", "latency"} for any 200 JSON answer, or None on failure. "prices"
+    maps each requested pair to its price (None when it could not be parsed);
+    "price" is the first pair's. A plain source dict is a USD/JPY request.
+    """
+    pairs = source.get("pairs") or [LEGACY_PAIR]
+    parse = source.get("parse") or parse_codes
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        resp = await client.get(source["url"], timeout=FX_SOURCE_TIMEOUT)
+        if resp.status_code != 200:
+            outcome = f"http_{resp.status_code}"
+            return None
+        prices = parse(resp.json(), pairs)
+        outcome = "ok" if any(price is not None for price in prices.values()) else "no_price"
+        return {
+            "source": source["name"],
+            "pairs": pairs,
+            "prices": prices,
+            "price": prices.get(pairs[0]),
+            "latency": time.perf_counter() - started,
+        }
+    except asyncio.CancelledError:
+        outcome = "cancelled"           # hedge loser or deadline
+        raise
+    finally:
+        source_fetch_seconds.observe(time.perf_counter() - started, source["name"], outcome)
+
+
+def _priced(answer: dict) -> bool:
+    return any(price is not None for price in answer["prices"].values())
+
+
+def _record(name: str, answer: dict):
+    source_registry.record(name, answer["latency"], "ok" if _priced(answer) else "no_price")
+
+
+# === Fan-out ===
+async def fetch_all_sources(sources: list, deadline: float | None = None) -> list:
+    """
+    Query every source concurrently and return the answers that arrived
+    before the deadline. Stragglers are cancelled, failures are dropped.
+    """
+    if deadline is None:
+        deadline = FX_FETCH_DEADLINE
+    client = get_http_client()
+    tasks = [asyncio.create_task(fetch_source(client, src)) for src in sources]
+    if not tasks:
+        return []
+
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+
+    results = []
+    for src, task in zip(sources, tasks):
+        if task not in done:
+            source_registry.record(src["name"], deadline, "error")          # timed out
+            continue
+        answer = None if task.cancelled() or task.exception() is not None else task.result()
+        if answer is None:
+            source_registry.record(src["name"], None, "error")
+            continue
+        _record(src["name"], answer)
+        results.append(answer)
+    return results
+
+
+# === Hedged fetch ===
+async def fetch_hedged(sources: list, want: int, max_hedges: int | None = None,
+                       deadline: float | None = None, rank: bool = True) -> list:
+    """
+    Ask the `want` best-ranked sources first (the first `want` as given when
+    `rank` is False). When one of them has not answered within its observed p90
+    latency (or fails), fire the next request in line that covers all of its
+    pairs, up to `max_hedges` extra requests. Returns as soon as `want` priced answers are
+    in, or whatever arrived by the deadline.
+    """
+    if deadline is None:
+        deadline = FX_FETCH_DEADLINE
+    budget = FX_MAX_HEDGES if max_hedges is None else max_hedges
+    client = get_http_client()
+    queue = source_registry.rank(sources) if rank else list(sources)
+    loop = asyncio.get_running_loop()
+    ends_at = loop.time() + deadline
+
+    pending = {}                      # task -> (source, started_at)
+    hedged = set()                    # tasks that already triggered a hedge
+
+    def launch(stalled: dict | None = None) -> bool:
+        """Start the next request in line or, to hedge `stalled`, the next one covering its pairs."""
+        if stalled is None:
+            index = 0
+        else:
+            needed = set(stalled.get("pairs") or [LEGACY_PAIR])
+            index = next((i for i, src in enumerate(queue) if needed <= set(src.get("pairs") or [LEGACY_PAIR])), None)
+            if index is None:
+                return False
+        src = queue.pop(index)
+        pending[asyncio.create_task(fetch_source(client, src))] = (src, loop.time())
+        return True
+
+    for _ in range(min(want, len(queue))):
+        launch()
+
+    results = []
+    priced = 0
+    while pending and priced < want:
+        now = loop.time()
+        if now >= ends_at:
+            break
+        wake_at = ends_at
+        for task, (src, started_at) in pending.items():
+            if task not in hedged:
+                wake_at = min(wake_at, started_at + source_registry.hedge_delay(src["name"]))
+        done, _ = await asyncio.wait(pending, timeout=max(0.0, wake_at - now),
+                                     return_when=asyncio.FIRST_COMPLETED)
+
+        for task in done:
+            src, _ = pending.pop(task)
+            answer = None if task.cancelled() or task.exception() is not None else task.result()
+            if answer is None:
+                source_registry.record(src["name"], None, "error")
+            else:
+                _record(src["name"], answer)
+                results.append(answer)
+                if _priced(answer):
+                    priced += 1
+                    continue
+            # Failed or unpriced: replace it if this request was not already hedged
+            if task not in hedged and budget > 0 and launch(src):
+                budget -= 1
+
+        now = loop.time()
+        for task, (src, started_at) in list(pending.items()):
+            if task in hedged or now - started_at < source_registry.hedge_delay(src["name"]):
+                continue
+            hedged.add(task)
+            if budget > 0 and launch(src):
+                budget -= 1
+
+    # Losers of a race are just cancelled; only requests cut off by the deadline count as failures.
+    timed_out = loop.time() >= ends_at
+    for task, (src, _) in pending.items():
+        task.cancel()
+        if timed_out:
+            source_registry.record(src["name"], deadline, "error")
+    return results
+
+
+# === Cached, planned fetch for many pairs (stale-while-revalidate) ===
+def _per_pair(answer: dict) -> dict:
+    """Split a request's answer into one {"source", "price", "latency"} answer per pair."""
+    return {
+        pair: {"source": answer["source"], "price": answer["prices"].get(pair), "latency": answer["latency"]}
+        for pair in answer["pairs"]
+    }
+
+
+def _record_history(quotes: dict):
+    """Queue the priced {(source, pair): quote} just fetched upstream for ai05_quotes, under one timestamp."""
+    ts = datetime.utcnow()
+    for (name, pair), quote in quotes.items():
+        if quote is not None and quote["price"] is not None:
+            record_quote(pair, name, quote["price"], ts)
+
+
+async def probe_sources(sources: list):
+    """Health probe: one USD/JPY request per source (or its planned batch request)."""
+    await fetch_all_sources([build_request(src, [LEGACY_PAIR]) for src in sources if supports(src, LEGACY_PAIR)])
+
+
+async def fetch_pairs(pairs: list, sources: list, deadline: float | None = None) -> dict:
+    """
+    Quotes for every pair in `pairs`: {pair: [{"source", "price", "latency"}]},
+    in source order. Goes through the shared quote cache: fresh and stale
+    entries are served from memory (stale ones are refreshed in the background).
+    The misses are covered by plan_requests, so providers that return many
+    pairs per call are asked once for all of them; fetching 30 pairs costs
+    about as many upstream calls as fetching 1.
+    """
+    # Probe unhealthy sources in the background, query only healthy ones here.
+    source_registry.ensure_prober(sources, probe_sources)
+    order = {src["name"]: i for i, src in enumerate(sources)}
+    by_name = {src["name"]: src for src in sources}
+    sources = source_registry.rank(source_registry.select(sources))
+
+    answers = {pair: [] for pair in pairs}
+    cached_keys, stale = set(), []
+    for src in sources:
+        for pair in pairs:
+            if not supports(src, pair):
+                continue
+            cached, state = quote_cache.lookup((src["name"], pair))
+            if state == MISS:
+                continue
+            cached_keys.add((src["name"], pair))
+            if cached is not None:
+                answers[pair].append(cached)
+            if state == STALE:
+                stale.append((src["name"], pair))
+
+    async def _fetch(requests):
+        # Requests that fail are cached as None too, so a warm cache never waits on them.
+        results = {}
+        for request in requests:
+            for pair in request["pairs"]:
+                results[(request["name"], pair)] = None
+        for answer in await fetch_all_sources(requests, deadline):
+            for pair, quote in _per_pair(answer).items():
+                results[(answer["source"], pair)] = quote
+        _record_history(results)
+        return results
+
+    if stale:
+        def _refresh(keys):
+            wanted = {}
+            for name, pair in keys:
+                wanted.setdefault(name, []).append(pair)
+            return _fetch([build_request(by_name[name], pair_list) for name, pair_list in wanted.items()])
+        quote_cache.refresh(stale, _refresh)
+
+    need = None
+    if FX_QUOTE_TARGET:
+        need = {pair: max(FX_QUOTE_TARGET - sum(a["price"] is not None for a in answers[pair]), 0) for pair in pairs}
+    planned, backups = plan_requests(sources, pairs, need, skip=cached_keys)
+    if planned and need is not None and backups:
+        # Enough requests to choose from: send the planned ones and hedge stragglers with the backups.
+        fetched = {}
+        for answer in await fetch_hedged(planned + backups, len(planned), deadline=deadline, rank=False):
+            for pair, quote in _per_pair(answer).items():
+                fetched[(answer["source"], pair)] = quote
+                quote_cache.put((answer["source"], pair), quote)
+                answers[pair].append(quote)
+        _record_history(fetched)
+    elif planned:
+        for (name, pair), quote in (await _fetch(planned)).items():
+            quote_cache.put((name, pair), quote)
+            if quote is not None:
+                answers[pair].append(quote)
+
+    for pair_answers in answers.values():
+        pair_answers.sort(key=lambda a: order.get(a["source"], len(order)))
+    return answers
+
+
+async def fetch_quotes(sources: list, pair: str = LEGACY_PAIR, deadline: float | None = None) -> list:
+    """fetch_pairs for a single pair: [{"source", "price", "latency"}]."""
+    return (await fetch_pairs([pair], sources, deadline))[pair]
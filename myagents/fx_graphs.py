@@ -1,27 +1,37 @@
 import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.ticker import AutoLocator, ScalarFormatter
 from datetime import datetime
 import os
+import io
+
+from .chart_store import atomic_write_bytes
 
 # Ensure WEB_CHARTS_DIR exists (should match the one in atlasfx_agent.py)
 WEB_CHARTS_DIR = os.path.join(os.path.dirname(__file__), "charts")
 os.makedirs(WEB_CHARTS_DIR, exist_ok=True)
 
-def plot_fx_setup(pair: str, price: float, source: str = "Simulated", save_path: str = None) -> str:
-    """
-    Generate a simple FX 4H setup chart and return file path.
-    Each chart filename is unique using source name and timestamp.
-    If save_path is provided, save the chart there.
-    """
+def _series(entry: float, history: list | None) -> tuple:
+    """x positions, y values and x tick labels: the stored price history, else the 3-point sketch."""
+    if history:
+        return list(range(len(history))), list(history), None
+    return [0, 1, 2], [entry - 1, entry, entry + 1], ["T-1", "T", "T+1"]
+
+
+def _draw_fx_setup(pair: str, price: float, source: str, history: list | None = None):
+    """Draw the 4H setup on a fresh pyplot figure (caller saves and closes it)."""
     entry = price
     sl = entry - 0.5
     tp = entry + 1.5
 
     plt.figure(figsize=(6, 3.5))
-    xs = ["T-1", "T", "T+1"]
-    ys = [entry - 1, entry, entry + 1]
-    plt.plot(xs, ys, marker="o", label=pair)
+    xs, ys, ticks = _series(entry, history)
+    plt.plot(xs, ys, marker="o" if ticks else None, label=pair)
+    if ticks:
+        plt.xticks(xs, ticks)
 
     for lvl, col, lbl in [(entry, "blue", "Entry"), (sl, "red", "SL"), (tp, "green", "TP")]:
         plt.axhline(lvl, color=col, linestyle="--", label=f"{lbl} {lvl:.4f}")
@@ -29,12 +39,111 @@ def plot_fx_setup(pair: str, price: float, source: str = "Simulated", save_path:
     plt.title(f"{pair} – 4H Setup ({source})")
     plt.legend()
 
+
+def plot_fx_setup(pair: str, price: float, source: str = "Simulated", save_path: str = None,
+                  history: list | None = None) -> str:
+    """
+    Generate a simple FX 4H setup chart and return file path.
+    Each chart filename is unique using source name and timestamp.
+    If save_path is provided, save the chart there.
+    If history (recent prices, oldest first) is given, it is drawn as the price line.
+    """
+    _draw_fx_setup(pair, price, source, history)
+
     timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
     fname = f"{pair.replace('/', '')}_{source}_{timestamp}.png"
 
     # If save_path is provided, use it; else save to WEB_CHARTS_DIR
     if save_path is None:
         save_path = os.path.join(WEB_CHARTS_DIR, fname)
-    plt.savefig(save_path, dpi=150, bbox_inches="tight")
+    # Render to memory, then write atomically so nobody serves a half-written PNG
+    buf = io.BytesIO()
+    plt.savefig(buf, format="png", dpi=150, bbox_inches="tight")
+    plt.close()
+    atomic_write_bytes(save_path, buf.getvalue())
+    return save_path
+
+
+def render_fx_png(pair: str, price: float, source: str = "Simulated", history: list | None = None) -> bytes:
+    """Same chart as plot_fx_setup, returned as PNG bytes instead of written to disk."""
+    _draw_fx_setup(pair, price, source, history)
+    buf = io.BytesIO()
+    plt.savefig(buf, format="png", dpi=150, bbox_inches="tight")
     plt.close()
-    return save_path
\ No newline at end of file
+    return buf.getvalue()
+
+
+# === Batch rendering ===
+# Building a pyplot figure dominates the cost of a single chart, so the batch
+# API builds one figure + axes template per call (object-oriented API, no
+# pyplot state) and only updates line data and labels for each record.
+
+class _SetupTemplate:
+    def __init__(self):
+        self.fig = Figure(figsize=(6, 3.5))
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        (self.series,) = self.ax.plot([0, 1, 2], [0.0, 0.0, 0.0], marker="o")
+        self.levels = [self.ax.axhline(0.0, color=col, linestyle="--") for col in ("blue", "red", "green")]
+
+    def draw(self, record: dict):
+        pair = record["pair"]
+        entry = float(record["price"])
+        levels = record.get("levels") or {}
+        sl = levels.get("sl", entry - 0.5)
+        tp = levels.get("tp", entry + 1.5)
+        entry = levels.get("entry", entry)
+
+        xs, ys, ticks = _series(entry, record.get("history"))
+        self.series.set_data(xs, ys)
+        self.series.set_marker("o" if ticks else "None")
+        self.series.set_label(pair)
+        if ticks:
+            self.ax.set_xticks(xs, ticks)
+        else:
+            self.ax.xaxis.set_major_locator(AutoLocator())
+            self.ax.xaxis.set_major_formatter(ScalarFormatter())
+        for line, lvl, lbl in zip(self.levels, (entry, sl, tp), ("Entry", "SL", "TP")):
+            line.set_ydata([lvl, lvl])
+            line.set_label(f"{lbl} {lvl:.4f}")
+
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.ax.set_title(f"{pair} – 4H Setup ({record.get('source', 'Simulated')})")
+        self.ax.legend()
+
+    def png(self) -> bytes:
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format="png", dpi=150, bbox_inches="tight")
+        return buf.getvalue()
+
+
+def render_fx_png_batch(records: list) -> list:
+    """
+    Render many charts with one reused figure. Each record is
+    {"pair", "price", "source"?, "levels"?: {"entry", "sl", "tp"}, "history"?: [prices]}.
+    Returns PNG bytes per record.
+    """
+    template = _SetupTemplate()
+    try:
+        pngs = []
+        for record in records:
+            template.draw(record)
+            pngs.append(template.png())
+        return pngs
+    finally:
+        template.fig.clear()          # nothing survives the call
+
+
+def plot_fx_batch(records: list, out_dir: str = WEB_CHARTS_DIR) -> list:
+    """
+    Batch version of plot_fx_setup: writes every record's PNG in one pass and
+    returns the paths. record["save_path"] wins over the generated file name.
+    """
+    timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    paths = []
+    for record, png in zip(records, render_fx_png_batch(records)):
+        save_path = record.get("save_path") or os.path.join(
+            out_dir, f"{record['pair'].replace('/', '')}_{record.get('source', 'Simulated')}_{timestamp}.png")
+        paths.append(atomic_write_bytes(save_path, png))
+    return paths
@@ -0,0 +1,183 @@
+# myagents/fx_sources.py
+# FX provider adapters and the request planner.
+# Each source is a plain dict: "name", a "url" template and, for providers that
+# return many pairs in one response, a "batch" kind:
+#   (none)   one request per pair; the url uses {base} / {quote} (or their
+#            lowercase {base_l} / {quote_l}). A url without placeholders is a
+#            fixed USD/JPY endpoint.
+#   "pairs"  one request lists several pair codes in {codes} (max "max_pairs").
+#   "table"  one request returns a rate table against a base currency, so it
+#            covers every pair of currencies in the table ({currencies} lists
+#            the ones needed). Crosses are derived: A/B = rate(B) / rate(A).
+# "parse" optionally overrides how a response is turned into prices.
+# plan_requests covers a set of pairs with as few upstream calls as possible.
+
+import re
+import math
+
+LEGACY_PAIR = "USD/JPY"      # what a url without placeholders quotes
+
+# Currency codes recognised in free text (pairs_in_text)
+CURRENCIES = {
+    "USD", "EUR", "JPY", "GBP", "CHF", "AUD", "CAD", "NZD", "CNY", "HKD", "SGD", "SEK", "NOK", "DKK",
+    "MXN", "ZAR", "TRY", "INR", "KRW", "BRL", "PLN", "CZK", "HUF", "ILS", "THB", "IDR", "MYR", "PHP",
+    "TWD", "SAR", "AED",
+}
+_PAIR_IN_TEXT = re.compile(r"\b([A-Za-z]{3})(?:\s*[/-]\s*)?([A-Za-z]{3})\b")
+
+
+# === Pairs ===
+def normalize_pair(pair: str) -> str:
+    """'usdjpy', 'USD-JPY', 'usd/jpy' -> 'USD/JPY'."""
+    code = "".join(ch for ch in pair.upper() if ch.isalpha())
+    if len(code) != 6:
+        raise ValueError(f"Not a currency pair: {pair!r}")
+    return f"{code[:3]}/{code[3:]}"
+
+
+def split_pairs(pairs: str) -> list:
+    """'USD/JPY, eurusd' -> ['USD/JPY', 'EUR/USD'] (order kept, duplicates dropped)."""
+    return list(dict.fromkeys(normalize_pair(p) for p in pairs.split(",") if p.strip()))
+
+
+def pairs_in_text(text: str) -> list:
+    """Pairs named in a user message: "EUR/USD and gbpjpy?" -> ['EUR/USD', 'GBP/JPY']."""
+    pairs = []
+    for first, second in _PAIR_IN_TEXT.findall(text or ""):
+        first, second = first.upper(), second.upper()
+        if first != second and first in CURRENCIES and second in CURRENCIES:
+            pairs.append(f"{first}/{second}")
+    return list(dict.fromkeys(pairs))
+
+
+def pair_code(pair: str) -> str:
+    return pair.replace("/", "")
+
+
+# === Response parsers: (data, pairs) -> {pair: price | None} ===
+def _number(value) -> float | None:
+    if isinstance(value, dict):
+        value = value.get("rate", value.get("price"))
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) and number > 0 else None
+
+
+def parse_codes(data, pairs: list) -> dict:
+    """Prices keyed by pair code ("USDJPY") under "rates", "quotes" or the top level; "price" for a single pair."""
+    prices = {pair: None for pair in pairs}
+    if not isinstance(data, dict):
+        return prices
+    for pair in pairs:
+        code = pair_code(pair)
+        for container in (data.get("rates"), data.get("quotes"), data):
+            if isinstance(container, dict) and code in container:
+                prices[pair] = _number(container[code])
+                break
+    if len(pairs) == 1 and prices[pairs[0]] is None and "price" in data:
+        prices[pairs[0]] = _number(data["price"])
+    return prices
+
+
+def parse_table(data, pairs: list) -> dict:
+    """Rate table against a base currency ("rates", "quote" or CurrencyLayer-style "quotes"), crosses derived."""
+    prices = {pair: None for pair in pairs}
+    if not isinstance(data, dict):
+        return prices
+    base = data.get("base") or data.get("source") or "USD"
+    table = data.get("rates") or data.get("quote") or data.get("conversion_rates")
+    if not isinstance(table, dict) and isinstance(data.get("quotes"), dict):
+        # {"source": "USD", "quotes": {"USDJPY": 151.2, ...}}
+        table = {code[len(base):]: rate for code, rate in data["quotes"].items() if code.startswith(base)}
+    if not isinstance(table, dict):
+        return prices
+    rates = {currency: _number(rate) for currency, rate in table.items()}
+    rates[base] = 1.0
+    for pair in pairs:
+        first, second = pair.split("/")
+        if rates.get(first) and rates.get(second):
+            prices[pair] = rates[second] / rates[first]
+    return prices
+
+
+# === Free Open FX/Stock Sources ===
+FREE_SOURCES = [
+    {"name": "FreeForexAPI", "url": "https://www.freeforexapi.com/api/live?pairs={codes}", "batch": "pairs", "max_pairs": 30},
+    {"name": "CoinGecko", "url": "https://api.coingecko.com/api/v3/simple/price?ids=usd&vs_currencies=jpy"},
+    {"name": "YahooFinance", "url": "https://query1.finance.yahoo.com/v8/finance/chart/{base}{quote}=X"},
+    {"name": "TwelveData", "url": "https://api.twelvedata.com/time_series?symbol={base}/{quote}&interval=1min&apikey=demo"},
+    {"name": "AlphaVantage", "url": "https://www.alphavantage.co/query?function=CURRENCY_EXCHANGE_RATE&from_currency={base}&to_currency={quote}&apikey=demo"},
+    {"name": "Finnhub", "url": "https://finnhub.io/api/v1/forex/rates?base=USD", "batch": "table"},
+    {"name": "Marketstack", "url": "https://api.marketstack.com/v1/eod?access_key=demo&symbols={base}{quote}"},
+    {"name": "Polygon.io", "url": "https://api.polygon.io/v1/last/forex/{base}/{quote}?apiKey=demo"},
+    {"name": "FCSAPI", "url": "https://fcsapi.com/api-v3/forex/latest?symbol={base}{quote}&access_key=demo"},
+    {"name": "Investing.com", "url": "https://www.investing.com/quotes/{base_l}-{quote_l}"},
+    {"name": "TradingView", "url": "https://www.tradingview.com/symbols/{base}{quote}/"},
+    {"name": "CurrencyLayer", "url": "https://api.currencylayer.com/live?currencies={currencies}&source=USD&access_key=demo", "batch": "table"},
+    {"name": "Exchangeratesapi", "url": "https://api.exchangeratesapi.io/latest?symbols={currencies}&base=USD", "batch": "table"},
+    {"name": "X-Rates", "url": "https://www.x-rates.com/calculator/?from={base}&to={quote}&amount=1"},
+    {"name": "OANDA", "url": "https://www1.oanda.com/rates/api/v1/rates/{base}{quote}"},
+    {"name": "ForexPython", "url": "https://www.forexpython.com/api/latest/{base}/{quote}"},
+    {"name": "FXCM", "url": "https://www.fxcm.com/forex-data-api/"},
+    {"name": "OpenExchangeRates", "url": "https://openexchangerates.org/api/latest.json?app_id=demo", "batch": "table"},
+    {"name": "XE.com", "url": "https://xecdapi.xe.com/v1/convert_from.json/?from={base}&to={quote}&amount=1"},
+    {"name": "AlphaQuery", "url": "https://www.alphaquery.com/forex/{base}{quote}"}
+]
+
+
+# === Adapters ===
+def supports(source: dict, pair: str) -> bool:
+    if source.get("batch") or "{" in source["url"]:
+        return True
+    return pair == LEGACY_PAIR
+
+
+def build_request(source: dict, pairs: list) -> dict:
+    """A concrete request for `source` covering `pairs` (same shape as a source dict, plus "pairs")."""
+    first, second = pairs[0].split("/")
+    currencies = sorted({c for pair in pairs for c in pair.split("/")} - {"USD"})
+    url = source["url"].format(
+        base=first, quote=second, base_l=first.lower(), quote_l=second.lower(),
+        codes=",".join(pair_code(p) for p in pairs), currencies=",".join(currencies),
+    )
+    parse = source.get("parse") or (parse_table if source.get("batch") == "table" else parse_codes)
+    return {"name": source["name"], "url": url, "pairs": list(pairs), "parse": parse}
+
+
+def _chunks(items: list, size: int) -> list:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def plan_requests(sources: list, pairs: list, need: dict | None = None, skip=()) -> tuple:
+    """
+    Cover `pairs` with requests. `sources` are in preference order (e.g. ranked
+    by health); batch providers are used before single-pair ones because one
+    call serves every pair. `need` is {pair: quotes still wanted}, None for
+    every source on every pair. (source name, pair) combinations in `skip`
+    (already cached) are not requested.
+    Returns (planned, backups): backups are the requests left over, in order,
+    for hedging when a planned one is slow or fails.
+    """
+    remaining = {pair: math.inf for pair in pairs} if need is None else dict(need)
+    ordered = [s for s in sources if s.get("batch")] + [s for s in sources if not s.get("batch")]
+    planned, backups = [], []
+    for source in ordered:
+        covered = [p for p in pairs if supports(source, p) and (source["name"], p) not in skip]
+        if not covered:
+            continue
+        if source.get("batch"):
+            # Asking for every covered pair costs the same single call
+            for chunk in _chunks(covered, source.get("max_pairs") or len(covered)):
+                useful = [p for p in chunk if remaining.get(p, 0) > 0]
+                (planned if useful else backups).append(build_request(source, chunk))
+                for pair in useful:
+                    remaining[pair] -= 1
+        else:
+            for pair in covered:
+                useful = remaining.get(pair, 0) > 0
+                (planned if useful else backups).append(build_request(source, [pair]))
+                if useful:
+                    remaining[pair] -= 1
+    return planned, backups
@@ -0,0 +1,112 @@
+# myagents/indicators.py
+# Vectorized technical indicators.
+# Every function takes a 2-D float array of prices shaped (symbols, periods),
+# oldest period first, and returns arrays of the same shape. A 1-D series is
+# treated as a single symbol. Periods without enough history are NaN.
+# All symbols are computed together: moving windows use cumulative sums and
+# the exponential averages step through time once with whole-column updates,
+# so the cost per symbol does not grow with the number of symbols.
+
+import numpy as np
+
+TRADING_DAYS = 252
+
+
+def as_matrix(prices) -> np.ndarray:
+    """(symbols, periods) float64 array from a 2-D or 1-D sequence of prices."""
+    matrix = np.asarray(prices, dtype=np.float64)
+    return matrix.reshape(1, -1) if matrix.ndim == 1 else matrix
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(values.shape, np.nan)
+    if window <= values.shape[1]:
+        csum = np.cumsum(values, axis=1)
+        out[:, window - 1] = csum[:, window - 1]
+        out[:, window:] = csum[:, window:] - csum[:, :-window]
+    return out
+
+
+def sma(prices, window: int) -> np.ndarray:
+    """Simple moving average over `window` periods."""
+    values = as_matrix(prices)
+    return _rolling_sum(values, window) / window
+
+
+def ema(prices, span: int, alpha: float | None = None) -> np.ndarray:
+    """
+    Exponential moving average, alpha = 2 / (span + 1) unless given. Seeded with
+    the SMA of the first `span` periods, NaN before that.
+    """
+    values = as_matrix(prices)
+    alpha = 2.0 / (span + 1) if alpha is None else alpha
+    out = np.full(values.shape, np.nan)
+    if span > values.shape[1]:
+        return out
+    current = values[:, :span].mean(axis=1)
+    out[:, span - 1] = current
+    for t in range(span, values.shape[1]):
+        current = current + alpha * (values[:, t] - current)
+        out[:, t] = current
+    return out
+
+
+def _ema_of(series: np.ndarray, span: int, start: int) -> np.ndarray:
+    """EMA of a series whose first `start` columns are NaN warm-up."""
+    out = np.full(series.shape, np.nan)
+    if start < series.shape[1]:
+        out[:, start:] = ema(series[:, start:], span)
+    return out
+
+
+def macd(prices, fast: int = 12, slow: int = 26, signal: int = 9) -> tuple:
+    """(macd line, signal line, histogram)."""
+    line = ema(prices, fast) - ema(prices, slow)
+    signal_line = _ema_of(line, signal, slow - 1)
+    return line, signal_line, line - signal_line
+
+
+def rsi(prices, period: int = 14) -> np.ndarray:
+    """Relative Strength Index (Wilder's smoothing), 0-100."""
+    values = as_matrix(prices)
+    out = np.full(values.shape, np.nan)
+    if period >= values.shape[1]:
+        return out
+    change = np.diff(values, axis=1)
+    gains = ema(np.clip(change, 0, None), period, alpha=1.0 / period)
+    losses = ema(np.clip(-change, 0, None), period, alpha=1.0 / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        strength = 100.0 - 100.0 / (1.0 + gains / losses)
+    # No losses at all is maximum strength, not a division error
+    strength = np.where((losses == 0) & ~np.isnan(gains), 100.0, strength)
+    out[:, 1:] = strength
+    return out
+
+
+def rolling_std(prices, window: int) -> np.ndarray:
+    """Population standard deviation over `window` periods."""
+    values = as_matrix(prices)
+    mean = _rolling_sum(values, window) / window
+    mean_sq = _rolling_sum(values * values, window) / window
+    return np.sqrt(np.clip(mean_sq - mean * mean, 0, None))
+
+
+def bollinger(prices, window: int = 20, k: float = 2.0) -> tuple:
+    """(middle, upper, lower) bands: SMA ± k standard deviations."""
+    middle = sma(prices, window)
+    width = k * rolling_std(prices, window)
+    return middle, middle + width, middle - width
+
+
+def realized_volatility(prices, window: int = 20, periods_per_year: int = TRADING_DAYS) -> np.ndarray:
+    """Annualized standard deviation of log returns over `window` periods, as a fraction."""
+    values = as_matrix(prices)
+    out = np.full(values.shape, np.nan)
+    returns = np.diff(np.log(values), axis=1)
+    out[:, 1:] = rolling_std(returns, window) * np.sqrt(periods_per_year)
+    return out
+
+
+def latest(indicator: np.ndarray) -> np.ndarray:
+    """Last value of each symbol's row."""
+    return indicator[:, -1]
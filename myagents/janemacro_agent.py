@@ -5,35 +5,18 @@ import asyncio
 # === Ensure parent directory is in sys.path for relative imports ===
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from dotenv import load_dotenv
-from openai import AsyncOpenAI
-from agents import Agent, Runner, set_tracing_disabled, OpenAIChatCompletionsModel
-from agents import function_tool
-
-# === Load environment variables ===
-load_dotenv()
-set_tracing_disabled(True)
-
-# === Get Gemini API key from environment ===
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("❌ GEMINI_API_KEY is missing in .env")
-
-# === Setup Gemini client with AsyncOpenAI ===
-external_client = AsyncOpenAI(
-    api_key=GEMINI_API_KEY,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-)
+from agents import Agent, Runner
+from .pipeline import pipeline_tool, call_all, narrate
+from .clients import get_model
+from .response_cache import cached_run, fingerprint
+from .streaming import stream_run
 
-# === Define the model configuration ===
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=external_client
-)
+# === Shared Gemini model (pooled client, see myagents/clients.py) ===
+model = get_model()
 
 # === Define tools (functions) that agent will use ===
 
-@function_tool
+@pipeline_tool
 def fetch_macro_data() -> str:
     """Fetch recent macroeconomic indicators."""
     return """
@@ -43,7 +26,7 @@ def fetch_macro_data() -> str:
 - 🇪🇺 ECB Rate: Held steady at 4.5%
 """.strip()
 
-@function_tool
+@pipeline_tool
 def analyze_policy_trends() -> str:
     """Analyze global fiscal and monetary trends."""
     return """
@@ -52,7 +35,7 @@ def analyze_policy_trends() -> str:
 - 🇨🇳 China ramps up infrastructure stimulus
 """.strip()
 
-@function_tool
+@pipeline_tool
 def summarize_macro_news() -> str:
     """Summarize key macroeconomic developments."""
     return """
@@ -80,6 +63,18 @@ Make it concise and actionable for global investors and macro followers.
     model=model
 )
 
+# === Response cache key part: these tools return constant output, so the tool set identifies it ===
+TOOLS_FINGERPRINT = fingerprint([tool.name for tool in janemacro.tools])
+
+# === Direct mode: the three tools are independent, run them together and call the LLM once ===
+async def run_direct(user_message: str = "Give me a macroeconomic update") -> str:
+    data, policy, news = await call_all((fetch_macro_data,), (analyze_policy_trends,), (summarize_macro_news,))
+    return await narrate(janemacro, user_message, {
+        "fetch_macro_data": data,
+        "analyze_policy_trends": policy,
+        "summarize_macro_news": news,
+    })
+
 # === Optional: Run directly for testing this agent file ===
 if __name__ == "__main__":
     async def main():
@@ -97,5 +92,8 @@ async def run_agent(user_message: str = "Give me a macroeconomic update") -> str
     Run the JaneMacro agent and return the final output.
     This will be called from main.py or any external script.
     """
-    result = await Runner.run(janemacro, user_message)
-    return result.final_output
+    return await cached_run(janemacro, user_message, TOOLS_FINGERPRINT)
+
+# === Streamed run (progress events for the SSE endpoints) ===
+def stream_agent(user_message: str = "Give me a macroeconomic update"):
+    return stream_run(janemacro, user_message, TOOLS_FINGERPRINT)
@@ -0,0 +1,108 @@
+# myagents/lazy_charts.py
+# Lazy, content-addressed charts.
+# Agent responses get a URL like /charts/<key>.png where <key> is a hash of
+# the chart inputs (pair, price, source and, when there is one, the price
+# history from ai05_quotes). Nothing is rendered until someone
+# fetches that URL; the PNG bytes are then kept in a size-bounded LRU so the
+# same chart is never rendered twice while it stays hot. Rendered charts are
+# also written to the chart store on disk as <key>.png, which survives restarts
+# and is shared with other processes.
+
+import os
+import re
+import json
+import asyncio
+import hashlib
+from collections import OrderedDict
+
+from .chart_service import render_png
+from .chart_store import chart_store
+
+# === Config (overridable from .env) ===
+CHART_CACHE_BYTES = int(os.getenv("CHART_CACHE_BYTES", str(32 * 1024 * 1024)))
+CHART_SPEC_MAX = int(os.getenv("CHART_SPEC_MAX", "10000"))       # registered-but-unrendered charts kept
+
+_KEY_RE = re.compile(r"^[0-9a-f]{32}$")
+
+_specs: OrderedDict = OrderedDict()          # key -> chart job
+_pngs: OrderedDict = OrderedDict()           # key -> PNG bytes
+_png_bytes = 0
+_rendering: dict = {}                        # key -> Task, so concurrent first fetches share one load/render
+
+
+def chart_key(pair: str, price: float, source: str, history: list | None = None) -> str:
+    spec = {"pair": pair, "price": float(price), "source": source}
+    if history:
+        spec["history"] = [float(p) for p in history]
+    canonical = json.dumps(spec, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+
+def is_chart_key(key: str) -> bool:
+    return bool(_KEY_RE.match(key))
+
+
+def register_chart(pair: str, price: float, source: str = "Simulated", history: list | None = None) -> str:
+    """Remember how to draw a chart and return its URL. Does not render."""
+    key = chart_key(pair, price, source, history)
+    _specs[key] = {"pair": pair, "price": float(price), "source": source, "history": history or None}
+    _specs.move_to_end(key)
+    while len(_specs) > CHART_SPEC_MAX:
+        _specs.popitem(last=False)
+    return f"/charts/{key}.png"
+
+
+def _cache_png(key: str, png: bytes):
+    global _png_bytes
+    if key in _pngs:
+        _png_bytes -= len(_pngs.pop(key))
+    _pngs[key] = png
+    _png_bytes += len(png)
+    while _png_bytes > CHART_CACHE_BYTES and len(_pngs) > 1:
+        _, old = _pngs.popitem(last=False)
+        _png_bytes -= len(old)
+
+
+async def get_chart_png(key: str) -> bytes | None:
+    """PNG bytes for a registered chart, rendering it on first fetch. None if unknown."""
+    png = _pngs.get(key)
+    if png is not None:
+        _pngs.move_to_end(key)
+        return png
+
+    task = _rendering.get(key)
+    if task is None:
+        # Registered before the first await, so concurrent first fetches share one load/render.
+        # It runs as its own task so a disconnecting client doesn't cancel it for the others.
+        task = asyncio.get_running_loop().create_task(_load(key))
+        _rendering[key] = task
+    return await asyncio.shield(task)
+
+
+async def _load(key: str) -> bytes | None:
+    """The PNG from the chart store (e.g. rendered by another process), else rendered from its spec."""
+    try:
+        png = await asyncio.to_thread(chart_store.read, f"{key}.png")
+        if png is not None:
+            _cache_png(key, png)
+            return png
+        spec = _specs.get(key)
+        if spec is None:
+            return None
+        png = await render_png(spec)
+        _cache_png(key, png)
+        await asyncio.to_thread(chart_store.write, f"{key}.png", png)
+        return png
+    finally:
+        if _rendering.get(key) is asyncio.current_task():
+            del _rendering[key]
+
+
+def cache_stats() -> dict:
+    return {
+        "registered": len(_specs),
+        "cached": len(_pngs),
+        "cached_bytes": _png_bytes,
+        "max_bytes": CHART_CACHE_BYTES,
+        "rendering": len(_rendering),
+    }
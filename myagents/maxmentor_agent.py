@@ -6,46 +6,29 @@ import asyncio
 # Add project root to sys.path for module imports (e.g., agents/)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from dotenv import load_dotenv
-from openai import AsyncOpenAI
-from agents import Agent, Runner, set_tracing_disabled, OpenAIChatCompletionsModel
-from agents import function_tool
+from agents import Agent, Runner
+from .pipeline import pipeline_tool, call, narrate
+from .clients import get_model
+from .response_cache import cached_run, fingerprint
+from .streaming import stream_run
 
-# === Load environment variables and disable tracing for local runs ===
-load_dotenv()
-set_tracing_disabled(True)
-
-# === Load Gemini API key ===
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("❌ GEMINI_API_KEY is missing in .env")
-
-# === Setup Gemini client ===
-external_client = AsyncOpenAI(
-    api_key=GEMINI_API_KEY,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-)
-
-# === Define model using Gemini ===
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=external_client
-)
+# === Shared Gemini model (pooled client, see myagents/clients.py) ===
+model = get_model()
 
 # === Tool: Return trending AI tools ===
-@function_tool
+@pipeline_tool
 def fetch_ai_tools_news() -> str:
     """Fetch latest news about trending AI tools."""
     return "LangChain, OpenAI Agents SDK, and Claude 3.5 are trending tools this week."
 
 # === Tool: Analyze trends in AI learning ===
-@function_tool
+@pipeline_tool
 def analyze_trends_in_learning(news: str = "") -> str:
     """Analyze what's currently trending in AI learning space."""
     return f"Based on tools like {news}, prompt engineering and agent-based development are hot topics."
 
 # === Tool: Suggest learning paths ===
-@function_tool
+@pipeline_tool
 def suggest_learning_paths(analysis: str = "") -> str:
     """Suggest learning paths based on trend analysis."""
     return f"""
@@ -72,6 +55,9 @@ Present it in Markdown for learners.
     model=model
 )
 
+# === Response cache key part: these tools return constant output, so the tool set identifies it ===
+TOOLS_FINGERPRINT = fingerprint([tool.name for tool in maxmentor.tools])
+
 # === Manual run block ===
 if __name__ == "__main__":
     async def main():
@@ -86,5 +72,19 @@ if __name__ == "__main__":
 # === Exported for main.py usage ===
 # === Exported for main.py usage ===
 async def run_agent(user_message: str = "What's the best way to start learning AI today?") -> str:
-    result = await Runner.run(maxmentor, user_message)
-    return result.final_output
\ No newline at end of file
+    return await cached_run(maxmentor, user_message, TOOLS_FINGERPRINT)
+
+# === Streamed run (progress events for the SSE endpoints) ===
+def stream_agent(user_message: str = "What's the best way to start learning AI today?"):
+    return stream_run(maxmentor, user_message, TOOLS_FINGERPRINT)
+
+# === Direct mode: each tool feeds the next, run the chain in Python and call the LLM once ===
+async def run_direct(user_message: str = "What's the best way to start learning AI today?") -> str:
+    news = await call(fetch_ai_tools_news)
+    analysis = await call(analyze_trends_in_learning, news)
+    paths = await call(suggest_learning_paths, analysis)
+    return await narrate(maxmentor, user_message, {
+        "fetch_ai_tools_news": news,
+        "analyze_trends_in_learning": analysis,
+        "suggest_learning_paths": paths,
+    })
@@ -0,0 +1,149 @@
+# myagents/metrics.py
+# In-process metrics in the Prometheus text format, served by GET /metrics.
+# Histograms and counters are plain Python objects: an observation is a
+# bisect and a few additions under a lock, cheap enough for every tool call
+# and upstream fetch. Label values are given positionally, in the order the
+# metric declares its labels.
+# LLM calls, their tokens and agentic tool calls are recorded by the run
+# hooks in response_cache.py; everything else is timed where it happens
+# (fx_fetch, chart_service, batch_writer, pipeline, api). This module has no
+# dependencies, so chart pool workers can import it cheaply.
+
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Bucket upper bounds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000)
+
+REGISTRY = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in self._values.items():
+                lines.append(f"{self.name}{_labels(self.labels, values)} {_number(total)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}            # label values -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *label_values, count: int = 1):
+        """Record `count` observations of `value`."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += count
+            series[-1] += value * count
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {values: list(series) for values, series in self._series.items()}
+        for values, series in snapshot.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labels, values, f'le="{bound}"')} {cumulative}")
+            cumulative += series[-2]
+            lines.append(f"{self.name}_bucket{_labels(self.labels, values, 'le="+Inf"')} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, values)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labels, values)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Read at scrape time from `read()`, which returns a number or {label values: number}."""
+
+    def __init__(self, name: str, help: str, read, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.labels = labels
+        REGISTRY.append(self)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.read()
+        except Exception as e:
+            print(f"⚠️ Warning: metric {self.name} could not be read: {e}")
+            return lines
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in values.items():
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {_number(value)}")
+        return lines
+
+
+def render() -> str:
+    """Every registered metric, Prometheus text exposition format (0.0.4)."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# === Metrics ===
+agent_run_seconds = Histogram("ai05_agent_run_seconds", "Agent run duration as seen by the API, cache hits included.",
+                              ("agent", "mode", "status"))
+llm_call_seconds = Histogram("ai05_llm_call_seconds", "Latency of one LLM call.", ("agent",))
+llm_tokens = Histogram("ai05_llm_tokens", "Tokens per LLM call.", ("agent", "kind"), buckets=TOKEN_BUCKETS)
+coalesced_requests = Counter("ai05_coalesced_requests_total", "API requests that joined an identical run already in flight.",
+                             ("agent", "mode"))
+tool_seconds = Histogram("ai05_tool_seconds", "Duration of one tool execution.", ("tool", "mode"))
+source_fetch_seconds = Histogram("ai05_source_fetch_seconds", "Upstream market-data request duration.",
+                                 ("source", "outcome"))
+chart_render_seconds = Histogram("ai05_chart_render_seconds", "Chart render time per chart, pool queueing included.",
+                                 ("kind",))
+db_write_seconds = Histogram("ai05_db_write_seconds", "Duration of one batched database write.", ("writer",))
+db_rows_written = Counter("ai05_db_rows_written_total", "Rows written by the batch writers.", ("writer", "status"))
@@ -0,0 +1,90 @@
+# myagents/orchestrator.py
+# Runs several agents concurrently with a per-agent timeout and a cap on how
+# many run at once. Used by /run-all-agents (and its streaming variant) in
+# api.py and by scheduler.py.
+
+import os
+import time
+import asyncio
+from contextlib import aclosing
+
+# === Config (overridable from .env) ===
+AGENT_TIMEOUT = float(os.getenv("AGENT_TIMEOUT", "90"))             # seconds per agent
+AGENT_MAX_PARALLEL = int(os.getenv("AGENT_MAX_PARALLEL", "5"))
+
+
+async def _run_one(name: str, func, args: tuple, semaphore: asyncio.Semaphore, timeout: float) -> dict:
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(func(*args), timeout=timeout)
+            status = {"status": "ok", "result": result}
+        except asyncio.TimeoutError:
+            status = {"status": "timeout", "error": f"{name} did not finish within {timeout:g}s"}
+        except Exception as e:
+            status = {"status": "error", "error": str(e)}
+        status["elapsed"] = round(time.perf_counter() - started, 3)
+        return status
+
+
+async def run_agents_concurrently(agents: list, *args, timeout: float | None = None,
+                                  max_parallel: int | None = None) -> dict:
+    """
+    Run every (name, async_func) pair in `agents` with the same positional args.
+    Returns {name: {"status": "ok"|"timeout"|"error", "result" or "error", "elapsed"}}
+    in the order the agents were given. A slow or failing agent never blocks the others.
+    """
+    timeout = AGENT_TIMEOUT if timeout is None else timeout
+    semaphore = asyncio.Semaphore(max_parallel or AGENT_MAX_PARALLEL)
+    outcomes = await asyncio.gather(
+        *(_run_one(name, func, args, semaphore, timeout) for name, func in agents)
+    )
+    return {name: outcome for (name, _), outcome in zip(agents, outcomes)}
+
+
+# === Streaming variant: merge several agents' event streams into one ===
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "64"))     # events buffered before agents wait for the client
+
+
+async def _stream_one(name: str, events_func, args: tuple, queue: asyncio.Queue,
+                      semaphore: asyncio.Semaphore, timeout: float):
+    async with semaphore:
+        try:
+            async with asyncio.timeout(timeout):
+                async with aclosing(events_func(*args)) as events:
+                    async for event in events:
+                        await queue.put(event)
+        except TimeoutError:
+            await queue.put({"event": "error", "agent": name, "error": f"{name} did not finish within {timeout:g}s"})
+        except Exception as e:
+            await queue.put({"event": "error", "agent": name, "error": str(e)})
+    await queue.put(None)       # this agent is finished
+
+
+async def stream_agents_concurrently(agents: list, *args, timeout: float | None = None,
+                                     max_parallel: int | None = None, queue_size: int | None = None):
+    """
+    Async generator over the events of every (name, events_func) pair in `agents`,
+    interleaved as they arrive. The queue between the agents and the consumer is
+    bounded, so a slow client pauses the agents instead of buffering without limit.
+    Closing the generator cancels every agent that is still running.
+    """
+    timeout = AGENT_TIMEOUT if timeout is None else timeout
+    semaphore = asyncio.Semaphore(max_parallel or AGENT_MAX_PARALLEL)
+    queue = asyncio.Queue(maxsize=queue_size or STREAM_QUEUE_SIZE)
+    tasks = [
+        asyncio.create_task(_stream_one(name, events_func, args, queue, semaphore, timeout))
+        for name, events_func in agents
+    ]
+    try:
+        running = len(tasks)
+        while running:
+            event = await queue.get()
+            if event is None:
+                running -= 1
+            else:
+                yield event
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,63 @@
+# myagents/pipeline.py
+# Direct execution mode.
+# Every agent follows a fixed tool sequence, and in agentic mode each step
+# costs a model round trip just to pick the next tool. In direct mode the
+# agent module runs that sequence itself in Python (independent steps in
+# parallel) and calls the LLM once, only to write the final narrative.
+
+import json
+import asyncio
+import inspect
+
+from agents import function_tool
+
+from .response_cache import cached_run, average_run_seconds
+from .metrics import tool_seconds
+from .artifacts import capture
+
+NARRATE_INSTRUCTIONS = """
+
+The tools listed above have already been run for you; their results are in the
+user message. Do not call any tools. Write the final response from those results.
+"""
+
+
+def pipeline_tool(func):
+    """function_tool that keeps the plain function as `.func` for direct pipelines."""
+    tool = function_tool(func)
+    tool.func = func
+    return tool
+
+
+async def call(tool, *args, **kwargs):
+    """Call a pipeline tool's plain function; sync ones run in a worker thread."""
+    with tool_seconds.time(tool.name, "direct"):
+        if inspect.iscoroutinefunction(tool.func):
+            return await tool.func(*args, **kwargs)
+        return await asyncio.to_thread(tool.func, *args, **kwargs)
+
+
+async def call_all(*steps):
+    """Run independent (tool, *args) steps concurrently and return their results in order."""
+    return await asyncio.gather(*(call(tool, *args) for tool, *args in steps))
+
+
+async def narrate(agent, user_message: str, tool_outputs: dict) -> str:
+    """The single LLM call of a direct run: the agent, without tools, writes up the results."""
+    for name, output in tool_outputs.items():
+        capture(name, output)
+    writer = agent.clone(tools=[], instructions=agent.instructions + NARRATE_INSTRUCTIONS)
+    prompt = (
+        f"{user_message}\n\n"
+        f"Tool results:\n{json.dumps(tool_outputs, indent=1, ensure_ascii=False, default=str)}"
+    )
+    # The prompt carries the tool results, so it is a complete response-cache key by itself
+    return await cached_run(writer, prompt, baseline=False)
+
+
+def time_saved(agent_name: str, elapsed: float) -> float | None:
+    """Seconds saved against the agent's average uncached agentic run, if one has been seen."""
+    baseline = average_run_seconds(agent_name)
+    if baseline is None:
+        return None
+    return round(baseline - elapsed, 3)
@@ -0,0 +1,219 @@
+# myagents/profiler.py
+# Opt-in wall-clock sampling profiler for single API requests.
+# A request is profiled when it carries an `X-Profile` header whose value
+# matches PROFILE_TOKEN (the header is ignored while no token is set) or, with
+# PROFILE_SAMPLE_RATE > 0, at random. While it runs, a sampler thread records the stack of every thread in
+# the process every PROFILE_INTERVAL seconds: the event loop (the async
+# handler and everything it awaits) and the worker threads running sync tools.
+# Chart jobs submitted during the request are marked, and the pool worker that
+# renders them samples itself and leaves its stacks next to the profile.
+# The event loop is shared, so other requests running at the same time show
+# up in the profile as well.
+# Profiles are folded stacks ("thread;outer;...;inner count", one line each,
+# the input format of flamegraph.pl and speedscope) in a BoundedFileStore.
+# When profiling is off, a request costs one header lookup (and one random()
+# call when sampling is enabled).
+
+import os
+import sys
+import hmac
+import time
+import uuid
+import random
+import asyncio
+import threading
+from collections import Counter
+from contextvars import ContextVar
+
+from .chart_store import BoundedFileStore
+
+# === Config (overridable from .env) ===
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))            # share of requests profiled at random
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")                                    # unset: the X-Profile header is ignored
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))              # seconds between samples
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", "2"))
+PROFILES_DIR = os.getenv("PROFILES_DIR", os.path.join(os.path.dirname(__file__), "profiles"))
+PROFILE_STORE_MAX_BYTES = int(os.getenv("PROFILE_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+PROFILE_STORE_MAX_AGE = float(os.getenv("PROFILE_STORE_MAX_AGE", str(3 * 24 * 3600)))     # seconds
+
+PROFILE_SUFFIX = ".folded"
+PART_MARK = ".part-"         # chart worker stacks waiting to be merged into their profile
+
+profile_store = BoundedFileStore(PROFILES_DIR, PROFILE_STORE_MAX_BYTES, PROFILE_STORE_MAX_AGE)
+
+_active: ContextVar[str | None] = ContextVar("profile_id", default=None)
+_running = 0
+_sampler_threads: set = set()
+
+
+def active_profile() -> str | None:
+    """Id of the profile the current request is recording, if any."""
+    return _active.get()
+
+
+# === Sampling ===
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+
+
+def _parked(frame) -> bool:
+    """A thread waiting for work (an idle pool worker, a queue feeder), not a tool blocked on I/O."""
+    code = frame.f_code
+    return code.co_filename.endswith(IDLE_FILES) or (code.co_name == "_worker" and code.co_filename.endswith("thread.py"))
+
+
+class Sampler:
+    """
+    Background thread recording the stacks of every other thread. Parked
+    threads are left out, except `loop_thread`: the event loop waiting in
+    select() is time spent awaiting I/O (the model, upstream sources).
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, loop_thread: int | None = None):
+        self.interval = interval
+        self.loop_thread = loop_thread
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return self.stacks
+
+    def _run(self):
+        me = threading.get_ident()
+        _sampler_threads.add(me)
+        try:
+            while not self._stop.wait(self.interval):
+                names = {t.ident: t.name for t in threading.enumerate()}
+                self.samples += 1
+                for ident, frame in sys._current_frames().items():
+                    if ident in _sampler_threads or (ident != self.loop_thread and _parked(frame)):
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(names.get(ident, f"thread-{ident}"))
+                    self.stacks[";".join(reversed(stack))] += 1
+        finally:
+            _sampler_threads.discard(me)
+
+
+def folded(stacks: Counter, root: str | None = None) -> str:
+    prefix = f"{root};" if root else ""
+    return "".join(f"{prefix}{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+# === Chart pool workers ===
+def sample_chart_job(profile_id: str | None, render, *args):
+    """render(*args), sampled into a part file of `profile_id` when one is given (runs in the worker)."""
+    if not profile_id:
+        return render(*args)
+    sampler = Sampler().start()
+    try:
+        return render(*args)
+    finally:
+        stacks = sampler.stop()
+        name = f"{profile_id}{PART_MARK}{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        profile_store.write(name, folded(stacks, root=f"chart-worker-{os.getpid()}").encode())
+
+
+def _merge_parts(profile_id: str) -> str:
+    parts = []
+    with os.scandir(profile_store.directory) as it:
+        for entry in it:
+            if entry.name.startswith(profile_id + PART_MARK):
+                data = profile_store.read(entry.name)
+                if data:
+                    parts.append(data.decode())
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+    return "".join(parts)
+
+
+# === Per-request capture (ASGI middleware) ===
+def _wants_profile(headers: list) -> bool:
+    for key, value in headers:
+        if key == b"x-profile":
+            return bool(PROFILE_TOKEN) and hmac.compare_digest(value.decode("latin-1").strip(), PROFILE_TOKEN)
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class ProfileMiddleware:
+    """
+    Profiles opted-in HTTP requests from the first byte received to the last
+    byte sent (streamed responses included) and names the stored profile in
+    an `X-Profile-Id` response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _running
+        if (scope["type"] != "http" or scope["path"].startswith("/admin/")
+                or not _wants_profile(scope["headers"]) or _running >= PROFILE_MAX_CONCURRENT):
+            return await self.app(scope, receive, send)
+
+        slug = scope["path"].strip("/").replace("/", "_") or "root"
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{slug}-{uuid.uuid4().hex[:8]}"
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"x-profile-id", (profile_id + PROFILE_SUFFIX).encode())]}
+            await send(message)
+
+        _running += 1
+        token = _active.set(profile_id)
+        sampler = Sampler(loop_thread=threading.get_ident()).start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _active.reset(token)
+            _running -= 1
+            await asyncio.to_thread(self._save, profile_id, sampler, scope)
+
+    @staticmethod
+    def _save(profile_id: str, sampler: Sampler, scope: dict):
+        stacks = sampler.stop()
+        body = folded(stacks) + _merge_parts(profile_id)
+        profile_store.write(profile_id + PROFILE_SUFFIX, body.encode())
+        profile_store.collect()
+        print(f"🔬 Profile {profile_id}{PROFILE_SUFFIX}: {scope['method']} {scope['path']}, "
+              f"{sampler.elapsed:.2f}s, {sampler.samples} samples")
+
+
+# === Admin listing ===
+def list_profiles() -> list:
+    """Stored profiles, newest first."""
+    profiles = []
+    with os.scandir(profile_store.directory) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(PROFILE_SUFFIX):
+                st = entry.stat()
+                profiles.append({"name": entry.name, "bytes": st.st_size, "created": st.st_mtime})
+    return sorted(profiles, key=lambda p: p["created"], reverse=True)
+
+
+def profile_path(name: str) -> str | None:
+    """Path of a stored profile, or None for anything else (parts, temp files, other names)."""
+    path = profile_store.path(name)
+    if not name.endswith(PROFILE_SUFFIX) or not os.path.isfile(path):
+        return None
+    return path
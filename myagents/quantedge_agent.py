@@ -3,56 +3,93 @@ import os
 import sys
 import asyncio
 import json
+from datetime import date, timedelta
+
+import numpy as np
 
 # Ensure parent dir is in sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from dotenv import load_dotenv
-from openai import AsyncOpenAI
-from agents import Agent, Runner, set_tracing_disabled, OpenAIChatCompletionsModel, function_tool
+from agents import Agent, Runner
+from .clients import get_model
+from .response_cache import cached_run, fingerprint
+from .streaming import stream_run
+from .pipeline import pipeline_tool, call_all, narrate
+from . import indicators
 
-# === ENV & Config ===
-load_dotenv()
-set_tracing_disabled(True)
+# === Shared Gemini model (pooled client, see myagents/clients.py) ===
+model = get_model()
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("❌ GEMINI_API_KEY is missing in .env")
+# === Tools ============================================================================
 
-# === External Gemini Client ===
-external_client = AsyncOpenAI(
-    api_key=GEMINI_API_KEY,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-)
+# === Price history ===
+# No equity feed is wired up yet, so the watchlist runs on a simulated daily
+# price path. It is seeded by the date, so every call on the same day sees the
+# same prices (and the response cache stays valid for the day).
+WATCHLIST = ["SPY", "TSLA", "AAPL"]
+HISTORY_DAYS = 120
+SERIES_POINTS = 10          # most recent values included in the JSON for charts
 
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=external_client
-)
 
-# === Tools ============================================================================
+def load_price_history(symbols: list, days: int = HISTORY_DAYS, as_of: date | None = None) -> tuple:
+    """(dates, prices) with prices shaped (len(symbols), days), oldest first."""
+    as_of = as_of or date.today()
+    rng = np.random.default_rng(int(as_of.strftime("%Y%m%d")))
+    start = rng.uniform(50, 500, size=(len(symbols), 1))
+    daily_vol = rng.uniform(0.008, 0.035, size=(len(symbols), 1))
+    returns = rng.normal(0.0003, 1.0, size=(len(symbols), days)) * daily_vol
+    prices = start * np.exp(np.cumsum(returns, axis=1))
+    dates = [(as_of - timedelta(days=days - 1 - i)).isoformat() for i in range(days)]
+    return dates, prices
 
-@function_tool
+
+def _signal_lines(symbol: str, close: float, hist: np.ndarray, rsi_now: float, vol: np.ndarray,
+                  upper: float, lower: float) -> list:
+    lines = []
+    if hist[-2] < 0 <= hist[-1]:
+        lines.append(f"MACD bullish crossover on {symbol}")
+    elif hist[-2] >= 0 > hist[-1]:
+        lines.append(f"MACD bearish crossover on {symbol}")
+    else:
+        lines.append(f"MACD {'above' if hist[-1] >= 0 else 'below'} signal on {symbol}")
+    if rsi_now >= 70:
+        lines.append(f"RSI overbought on {symbol} ({rsi_now:.0f})")
+    elif rsi_now <= 30:
+        lines.append(f"RSI oversold on {symbol} ({rsi_now:.0f})")
+    if vol[-1] > 1.25 * np.nanmedian(vol):
+        lines.append(f"High volatility alert on {symbol} ({vol[-1]:.0%} annualized)")
+    if close > upper:
+        lines.append(f"{symbol} closed above its upper Bollinger band")
+    elif close < lower:
+        lines.append(f"{symbol} closed below its lower Bollinger band")
+    return lines
+
+
+@pipeline_tool
 def fetch_quantsignal_data() -> str:
     """Fetch recent quant signal data including indicators, volatility, and asset targets."""
-    # Return signals as text and structured JSON (string)
-    signals_text = (
-        "📊 Quant Signals:\n"
-        "- MACD bullish crossover on SPY\n"
-        "- High volatility alert on TSLA\n"
-        "- RSI oversold on AAPL"
-    )
-    # Example structured data for visualization
-    signals_data = {
-        "dates": ["2025-08-08", "2025-08-09", "2025-08-10", "2025-08-11"],
-        "SPY_MACD": [0.1, 0.3, 0.5, 0.7],  # Example MACD values (rising)
-        "TSLA_Volatility": [1.2, 1.5, 3.8, 4.0],  # Volatility spikes
-        "AAPL_RSI": [65, 55, 30, 25]  # RSI dropping indicating oversold
-    }
+    dates, prices = load_price_history(WATCHLIST)
+    # All symbols in one pass per indicator
+    macd_line, _, hist = indicators.macd(prices)
+    rsi = indicators.rsi(prices)
+    vol = indicators.realized_volatility(prices)
+    _, upper, lower = indicators.bollinger(prices)
+
+    lines = []
+    for i, symbol in enumerate(WATCHLIST):
+        lines += _signal_lines(symbol, prices[i, -1], hist[i], rsi[i, -1], vol[i], upper[i, -1], lower[i, -1])
+    signals_text = "📊 Quant Signals:\n" + "\n".join(f"- {line}" for line in lines)
+
+    # Structured data for visualization: the latest values of each indicator
+    signals_data = {"dates": dates[-SERIES_POINTS:]}
+    for i, symbol in enumerate(WATCHLIST):
+        signals_data[f"{symbol}_MACD"] = np.round(macd_line[i, -SERIES_POINTS:], 3).tolist()
+        signals_data[f"{symbol}_Volatility"] = np.round(vol[i, -SERIES_POINTS:] * 100, 2).tolist()
+        signals_data[f"{symbol}_RSI"] = np.round(rsi[i, -SERIES_POINTS:], 1).tolist()
     # Attach JSON string to signals text for agent reference or external use
     return signals_text + "\n\n" + json.dumps(signals_data)
 
-@function_tool
+@pipeline_tool
 def analyze_quant_models(data: str = "") -> str:
     """Analyze quant models and return metrics like Sharpe ratio, drawdown, and alpha."""
     # Metrics text
@@ -70,7 +107,7 @@ def analyze_quant_models(data: str = "") -> str:
     }
     return metrics_text + "\n\n" + json.dumps(metrics_data)
 
-@function_tool
+@pipeline_tool
 def summarize_edge_cases() -> str:
     """Summarize special edge cases or anomalies detected in quant data."""
     # Summary text
@@ -100,6 +137,13 @@ Output should resemble a quant research digest with clear metrics.
     model=model
 )
 
+# === Response cache key part: the tool output only changes with the day's price history ===
+TOOLS_FINGERPRINT = fingerprint([tool.name for tool in quantedge.tools])
+
+
+def tools_fingerprint() -> str:
+    return fingerprint([TOOLS_FINGERPRINT, date.today().isoformat()])
+
 # === Runner (local test) ===
 if __name__ == "__main__":
     async def main():
@@ -119,5 +163,19 @@ async def run_agent(user_message: str = "Give me today's market update") -> str:
     Run the QuantEdge agent and return the final output,
     which includes text and embedded JSON strings for visualization.
     """
-    result = await Runner.run(quantedge, user_message)
-    return result.final_output
+    return await cached_run(quantedge, user_message, tools_fingerprint())
+
+# === Streamed run (progress events for the SSE endpoints) ===
+def stream_agent(user_message: str = "Give me today's market update"):
+    return stream_run(quantedge, user_message, tools_fingerprint())
+
+# === Direct mode: the three tools are independent, run them together and call the LLM once ===
+async def run_direct(user_message: str = "Give me today's market update") -> str:
+    signals, models, edge_cases = await call_all(
+        (fetch_quantsignal_data,), (analyze_quant_models,), (summarize_edge_cases,)
+    )
+    return await narrate(quantedge, user_message, {
+        "fetch_quantsignal_data": signals,
+        "analyze_quant_models": models,
+        "summarize_edge_cases": edge_cases,
+    })
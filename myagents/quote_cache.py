@@ -0,0 +1,111 @@
+# myagents/quote_cache.py
+# Process-wide quote cache shared by the market-data tools.
+# Keys are (source, pair). Entries are fresh for QUOTE_CACHE_TTL seconds, then
+# served stale for up to QUOTE_CACHE_STALE_TTL more seconds while a background
+# refresh runs (stale-while-revalidate). Size is bounded with LRU eviction.
+
+import os
+import time
+import asyncio
+from collections import OrderedDict
+
+# === Config (overridable from .env) ===
+QUOTE_CACHE_TTL = float(os.getenv("QUOTE_CACHE_TTL", "15"))
+QUOTE_CACHE_STALE_TTL = float(os.getenv("QUOTE_CACHE_STALE_TTL", "300"))
+QUOTE_CACHE_MAX_SIZE = int(os.getenv("QUOTE_CACHE_MAX_SIZE", "2048"))
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+class QuoteCache:
+    def __init__(self, ttl: float = QUOTE_CACHE_TTL, stale_ttl: float = QUOTE_CACHE_STALE_TTL,
+                 max_size: int = QUOTE_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()     # key -> (stored_at, value)
+        self._refreshing: set = set()                  # keys with a refresh in flight
+        self._tasks: set = set()                       # keep background tasks alive
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    # === Read / write ===
+    def lookup(self, key):
+        """Return (value, state) where state is FRESH, STALE or MISS."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, MISS
+        stored_at, value = entry
+        age = time.monotonic() - stored_at
+        if age <= self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value, FRESH
+        if age <= self.ttl + self.stale_ttl:
+            self._entries.move_to_end(key)
+            self.stale_hits += 1
+            return value, STALE
+        del self._entries[key]
+        self.misses += 1
+        return None, MISS
+
+    def put(self, key, value):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    # === Background revalidation ===
+    def refresh(self, keys: list, fetch):
+        """
+        Run `fetch(keys)` in the background unless those keys are already being
+        refreshed. `fetch` is an async callable returning {key: value}.
+        """
+        keys = [k for k in keys if k not in self._refreshing]
+        if not keys:
+            return
+        self._refreshing.update(keys)
+
+        async def _run():
+            try:
+                for key, value in (await fetch(keys)).items():
+                    self.put(key, value)
+                self.refreshes += 1
+            except Exception:
+                pass
+            finally:
+                self._refreshing.difference_update(keys)
+
+        task = asyncio.get_running_loop().create_task(_run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "refreshes": self.refreshes,
+            "refreshing": len(self._refreshing),
+        }
+
+    def clear(self):
+        self._entries.clear()
+
+
+# === Shared instance ===
+quote_cache = QuoteCache()
@@ -0,0 +1,221 @@
+# myagents/response_cache.py
+# Cache for agent runs.
+# A run is keyed on the agent name, the normalized prompt and a fingerprint of
+# the tool results it would see, so a repeated question with unchanged data
+# is answered from memory instead of a new LLM conversation. Entries expire
+# after a per-agent TTL; the in-memory store is a bounded LRU and can be
+# backed by a SQLite file (RESPONSE_CACHE_DB) that survives restarts and is
+# shared by the API and the scheduler.
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+from collections import OrderedDict, deque
+
+from agents import Runner, RunHooks
+
+from .metrics import llm_call_seconds, llm_tokens, tool_seconds
+from .artifacts import capture
+
+# === Config (overridable from .env) ===
+RESPONSE_CACHE_MAX_SIZE = int(os.getenv("RESPONSE_CACHE_MAX_SIZE", "256"))
+RESPONSE_CACHE_DB = os.getenv("RESPONSE_CACHE_DB")              # e.g. response_cache.sqlite3; unset = memory only
+
+# Seconds a cached answer stays valid. Override with RESPONSE_CACHE_TTL_<AGENT>, 0 disables.
+DEFAULT_TTLS = {
+    "AtlasFX": 60,
+    "CryptoNova": 60,
+    "JaneMacro": 3600,
+    "MaxMentor": 3600,
+    "QuantEdge": 3600,
+}
+
+
+def agent_ttl(agent_name: str) -> float:
+    default = DEFAULT_TTLS.get(agent_name, 300)
+    return float(os.getenv(f"RESPONSE_CACHE_TTL_{agent_name.upper()}", default))
+
+
+def normalize_prompt(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def fingerprint(data) -> str:
+    """Stable short hash of tool results (anything JSON serialisable)."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+# === Optional persistent backend ===
+class SQLiteBackend:
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, agent TEXT, expires_at REAL, output TEXT)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key: str) -> tuple | None:
+        """(expires_at, output) for a live entry, else None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT expires_at, output FROM response_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row
+
+    def put(self, key: str, agent: str, expires_at: float, output: str):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?)", (key, agent, expires_at, output))
+            conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+
+
+class ResponseCache:
+    def __init__(self, max_size: int = RESPONSE_CACHE_MAX_SIZE, backend: SQLiteBackend | None = None):
+        self.max_size = max_size
+        self.backend = backend
+        self._entries: OrderedDict = OrderedDict()      # key -> (expires_at, output)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(agent_name: str, prompt: str, tools_fingerprint: str) -> str:
+        raw = f"{agent_name}\x00{normalize_prompt(prompt)}\x00{tools_fingerprint}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    async def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+        if self.backend is not None:
+            row = await asyncio.to_thread(self.backend.get, key)
+            if row is not None:
+                self._remember(key, *row)
+                self.hits += 1
+                return row[1]
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, agent_name: str, ttl: float, output: str):
+        expires_at = time.time() + ttl
+        self._remember(key, expires_at, output)
+        if self.backend is not None:
+            await asyncio.to_thread(self.backend.put, key, agent_name, expires_at, output)
+
+    def _remember(self, key: str, expires_at: float, output: str):
+        self._entries[key] = (expires_at, output)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "persistent": self.backend is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# === Shared instance ===
+response_cache = ResponseCache(backend=SQLiteBackend(RESPONSE_CACHE_DB) if RESPONSE_CACHE_DB else None)
+
+
+# === Run hooks: LLM call latency, tokens and agentic tool timings for /metrics ===
+# (and the tool results, for a capture_tool_outputs() block around the run)
+class MetricsHooks(RunHooks):
+    """Times LLM calls (and counts their tokens) and tool calls of every run it is passed to."""
+
+    MAX_INFLIGHT = 4096                 # forget start times of calls that never ended (errors, cancels)
+
+    def __init__(self):
+        self._started = {}
+
+    def _start(self, key):
+        if len(self._started) >= self.MAX_INFLIGHT:
+            self._started.clear()
+        self._started[key] = time.perf_counter()
+
+    def _elapsed(self, key) -> float | None:
+        started = self._started.pop(key, None)
+        return None if started is None else time.perf_counter() - started
+
+    @staticmethod
+    def _tool_key(context, tool) -> tuple:
+        return ("tool", getattr(context, "tool_call_id", None) or id(context), tool.name)
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items):
+        self._start(("llm", id(context), agent.name))
+
+    async def on_llm_end(self, context, agent, response):
+        elapsed = self._elapsed(("llm", id(context), agent.name))
+        if elapsed is not None:
+            llm_call_seconds.observe(elapsed, agent.name)
+        usage = response.usage
+        if usage is not None and usage.requests:
+            llm_tokens.observe(usage.input_tokens, agent.name, "input")
+            llm_tokens.observe(usage.output_tokens, agent.name, "output")
+
+    async def on_tool_start(self, context, agent, tool):
+        self._start(self._tool_key(context, tool))
+
+    async def on_tool_end(self, context, agent, tool, result):
+        elapsed = self._elapsed(self._tool_key(context, tool))
+        if elapsed is not None:
+            tool_seconds.observe(elapsed, tool.name, "agentic")
+        capture(tool.name, result)          # for capture_tool_outputs() around agentic runs
+
+
+run_hooks = MetricsHooks()
+
+
+# === Uncached run durations per agent (baseline for direct mode's "time saved") ===
+_run_seconds: dict = {}
+
+
+def average_run_seconds(agent_name: str) -> float | None:
+    samples = _run_seconds.get(agent_name)
+    if not samples:
+        return None
+    return sum(samples) / len(samples)
+
+
+async def _run(agent, user_message: str, baseline: bool) -> str:
+    started = time.perf_counter()
+    result = await Runner.run(agent, user_message, hooks=run_hooks)
+    if baseline:
+        _run_seconds.setdefault(agent.name, deque(maxlen=20)).append(time.perf_counter() - started)
+    return result.final_output
+
+
+async def cached_run(agent, user_message: str, tools_fingerprint: str = "", baseline: bool = True) -> str:
+    """
+    Runner.run(agent, user_message).final_output, answered from the cache when
+    the same agent saw the same prompt with the same tool results recently.
+    Uncached durations are recorded per agent unless `baseline` is False.
+    """
+    ttl = agent_ttl(agent.name)
+    if ttl <= 0:
+        return await _run(agent, user_message, baseline)
+
+    key = response_cache.key(agent.name, user_message, tools_fingerprint)
+    cached = await response_cache.get(key)
+    if cached is not None:
+        return cached
+
+    output = await _run(agent, user_message, baseline)
+    if isinstance(output, str) and output:
+        await response_cache.put(key, agent.name, ttl, output)
+    return output
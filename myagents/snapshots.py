@@ -0,0 +1,76 @@
+# myagents/snapshots.py
+# Precomputed agent results.
+# scheduler.py runs every agent on its standing prompt and publishes the
+# result as one JSON file per agent in SNAPSHOTS_DIR: the summary, the tool
+# results it was written from (structured data), the chart URLs and when it was
+# generated. The charts are rendered into the chart store before publishing,
+# so their URLs work in any process that serves myagents/charts/.
+# api.py serves the files from GET /latest/{agent}. A file is re-read only when
+# its mtime changes, so a request costs one stat().
+
+import os
+import json
+import time
+import asyncio
+
+from .chart_store import atomic_write_bytes
+from .lazy_charts import get_chart_png
+
+# === Config (overridable from .env) ===
+SNAPSHOTS_DIR = os.getenv("SNAPSHOTS_DIR", os.path.join(os.path.dirname(__file__), "snapshots"))
+os.makedirs(SNAPSHOTS_DIR, exist_ok=True)
+
+_loaded: dict = {}          # agent -> (mtime_ns, snapshot, JSON bytes)
+
+
+def _path(agent: str) -> str:
+    return os.path.join(SNAPSHOTS_DIR, f"{agent}.json")
+
+
+# === Scheduler side ===
+async def prerender_charts(chart_urls: list) -> int:
+    """Render registered /charts/<key>.png URLs into the chart store. Returns how many are available."""
+    keys = [os.path.basename(url)[:-len(".png")] for url in chart_urls]
+    pngs = await asyncio.gather(*(get_chart_png(key) for key in keys), return_exceptions=True)
+    for url, png in zip(chart_urls, pngs):
+        if isinstance(png, BaseException) or png is None:
+            print(f"⚠️ Warning: could not pre-render {url}: {png}")
+    return sum(isinstance(png, bytes) for png in pngs)
+
+
+def publish_snapshot(agent: str, message: str, result: dict, data: dict, elapsed: float) -> dict:
+    """Atomically replace `agent`'s snapshot. `result` is parse_agent_output's dict."""
+    snapshot = {
+        "agent": agent,
+        "message": message,
+        "summary": result["summary"],
+        "chart_urls": result["chart_urls"],
+        "chart_imgs": result["chart_imgs"],
+        "data": data,
+        "generated_at": time.time(),
+        "elapsed": elapsed,
+    }
+    atomic_write_bytes(_path(agent), json.dumps(snapshot, ensure_ascii=False, default=str).encode())
+    return snapshot
+
+
+# === API side ===
+def latest_snapshot(agent: str) -> tuple | None:
+    """(snapshot, JSON bytes) of `agent`'s latest published snapshot, or None if there is none."""
+    path = _path(agent)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    cached = _loaded.get(agent)
+    if cached is not None and cached[0] == mtime:
+        return cached[1], cached[2]
+    try:
+        with open(path, "rb") as f:
+            body = f.read()
+        snapshot = json.loads(body)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Warning: unreadable snapshot for {agent}: {e}")
+        return None
+    _loaded[agent] = (mtime, snapshot, body)
+    return snapshot, body
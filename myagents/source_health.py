@@ -0,0 +1,202 @@
+# myagents/source_health.py
+# Health registry for the FX sources.
+# Tracks rolling latency, error rate and parse success per provider and keeps a
+# circuit breaker for each one. A source that fails (error, timeout or an
+# answer with no usable price) has its circuit opened with exponential backoff;
+# once the backoff expires it is re-checked by a background probe instead of
+# on the request path.
+
+import os
+import time
+import asyncio
+from bisect import bisect_left
+from collections import deque
+
+# === Config (overridable from .env) ===
+HEALTH_WINDOW = int(os.getenv("SOURCE_HEALTH_WINDOW", "50"))             # samples kept per source
+HEALTH_RECENT = float(os.getenv("SOURCE_HEALTH_RECENT", "900"))          # "recently returned a price", seconds
+BACKOFF_BASE = float(os.getenv("SOURCE_BACKOFF_BASE", "30"))             # first open period, seconds
+BACKOFF_MAX = float(os.getenv("SOURCE_BACKOFF_MAX", "3600"))
+PROBE_INTERVAL = float(os.getenv("SOURCE_PROBE_INTERVAL", "15"))
+HEDGE_QUANTILE = float(os.getenv("FX_HEDGE_QUANTILE", "0.9"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("FX_HEDGE_DEFAULT_DELAY", "0.5"))  # until a source has enough samples
+HEDGE_MIN_SAMPLES = 5
+
+# Latency histogram bucket upper bounds, seconds
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"      # backoff expired, waiting for a probe
+
+
+class SourceStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies = deque(maxlen=HEALTH_WINDOW)
+        self.outcomes = deque(maxlen=HEALTH_WINDOW)     # "ok" | "no_price" | "error"
+        self.failures = 0                               # consecutive
+        self.open_until = 0.0
+        self.last_price_at = None
+
+    @property
+    def state(self) -> str:
+        if self.failures == 0:
+            return CLOSED
+        return OPEN if time.monotonic() < self.open_until else HALF_OPEN
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(o == "error" for o in self.outcomes) / len(self.outcomes)
+
+    def parse_rate(self) -> float:
+        answered = [o for o in self.outcomes if o != "error"]
+        if not answered:
+            return 0.0
+        return sum(o == "ok" for o in answered) / len(answered)
+
+    def avg_latency(self) -> float | None:
+        if not self.latencies:
+            return None
+        return sum(self.latencies) / len(self.latencies)
+
+    def latency_histogram(self) -> list:
+        """Bucket counts over the rolling window; the last bucket is +Inf."""
+        counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        for lat in self.latencies:
+            counts[bisect_left(LATENCY_BUCKETS, lat)] += 1
+        return counts
+
+    def latency_quantile(self, q: float) -> float | None:
+        """Upper bound of the histogram bucket holding the q-th quantile."""
+        if not self.latencies:
+            return None
+        target = q * len(self.latencies)
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS + (max(self.latencies),), self.latency_histogram()):
+            seen += count
+            if seen >= target:
+                return bound
+        return max(self.latencies)
+
+    def snapshot(self) -> dict:
+        avg = self.avg_latency()
+        return {
+            "state": self.state,
+            "samples": len(self.outcomes),
+            "error_rate": round(self.error_rate(), 3),
+            "parse_rate": round(self.parse_rate(), 3),
+            "avg_latency": round(avg, 4) if avg is not None else None,
+            "p90_latency": self.latency_quantile(0.9),
+            "latency_histogram": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], self.latency_histogram())),
+            "consecutive_failures": self.failures,
+            "retry_in": max(0.0, round(self.open_until - time.monotonic(), 1)) if self.failures else 0.0,
+        }
+
+
+class SourceRegistry:
+    def __init__(self):
+        self._stats: dict = {}
+        self._prober: asyncio.Task | None = None
+
+    def stats(self, name: str) -> SourceStats:
+        if name not in self._stats:
+            self._stats[name] = SourceStats(name)
+        return self._stats[name]
+
+    # === Recording ===
+    def record(self, name: str, latency: float | None, outcome: str):
+        """outcome is "ok" (a price was parsed), "no_price" or "error"."""
+        st = self.stats(name)
+        if latency is not None:
+            st.latencies.append(latency)
+        st.outcomes.append(outcome)
+        if outcome == "ok":
+            st.failures = 0
+            st.open_until = 0.0
+            st.last_price_at = time.monotonic()
+        else:
+            st.failures += 1
+            st.open_until = time.monotonic() + min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (st.failures - 1))
+
+    def reliability(self, name: str) -> float:
+        """Consensus weight in [0.1, 1]: the share of recent requests that produced a price (1 if unseen)."""
+        st = self._stats.get(name)
+        if st is None or not st.outcomes:
+            return 1.0
+        return max(0.1, sum(o == "ok" for o in st.outcomes) / len(st.outcomes))
+
+    # === Selection for the hot path ===
+    def is_hot(self, name: str) -> bool:
+        st = self._stats.get(name)
+        if st is None or not st.outcomes:
+            return True                      # never tried: give it one chance
+        if st.state != CLOSED:
+            return False
+        return st.last_price_at is not None and time.monotonic() - st.last_price_at <= HEALTH_RECENT
+
+    def select(self, sources: list) -> list:
+        """Sources worth querying on the request path."""
+        hot = [src for src in sources if self.is_hot(src["name"])]
+        if hot:
+            return hot
+        # Nothing is healthy (e.g. the prober has not run yet): try the ones due for a probe.
+        return [src for src in sources if self.stats(src["name"]).state == HALF_OPEN]
+
+    def rank(self, sources: list) -> list:
+        """Best first: closed circuit, high parse rate, low median latency."""
+        def key(src):
+            st = self._stats.get(src["name"])
+            if st is None or not st.outcomes:
+                return (1, 0.0, HEDGE_DEFAULT_DELAY)
+            p50 = st.latency_quantile(0.5)
+            return (0 if st.state == CLOSED else 2, -st.parse_rate(), p50 if p50 is not None else HEDGE_DEFAULT_DELAY)
+        return sorted(sources, key=key)
+
+    def hedge_delay(self, name: str) -> float:
+        """How long to wait on a source before hedging it: its observed p90."""
+        st = self._stats.get(name)
+        if st is None or len(st.latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return st.latency_quantile(HEDGE_QUANTILE)
+
+    def due_for_probe(self, sources: list) -> list:
+        due = []
+        for src in sources:
+            st = self._stats.get(src["name"])
+            if st is None:
+                continue
+            if st.state == HALF_OPEN:
+                due.append(src)
+            elif st.state == CLOSED and not self.is_hot(src["name"]):
+                due.append(src)              # healthy but no price for too long
+        return due
+
+    # === Background probing ===
+    def ensure_prober(self, sources: list, probe):
+        """
+        Start (once per event loop) a background task that re-checks sources
+        whose backoff has expired. `probe(sources)` must fetch and record them.
+        """
+        if self._prober is not None and not self._prober.done():
+            return
+
+        async def _loop():
+            while True:
+                await asyncio.sleep(PROBE_INTERVAL)
+                due = self.due_for_probe(sources)
+                if due:
+                    try:
+                        await probe(due)
+                    except Exception:
+                        pass
+
+        self._prober = asyncio.get_running_loop().create_task(_loop())
+
+    def snapshot(self) -> dict:
+        return {name: st.snapshot() for name, st in sorted(self._stats.items())}
+
+
+# === Shared instance ===
+source_registry = SourceRegistry()
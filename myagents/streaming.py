@@ -0,0 +1,68 @@
+# myagents/streaming.py
+# Streamed agent runs.
+# Runner.run_streamed drives the same conversation as Runner.run but reports
+# progress as it happens. stream_run turns the SDK's stream events into small
+# plain dicts (tool calls, tool outputs, text deltas and the final output) that
+# the API forwards to clients as Server-Sent Events. It goes through the same
+# response cache as cached_run: a hit is a single "final" event, and a
+# completed uncached run is stored for the next caller.
+
+import time
+from collections import deque
+
+from agents import Runner
+from agents.stream_events import RawResponsesStreamEvent, RunItemStreamEvent
+
+from .response_cache import response_cache, agent_ttl, run_hooks, _run_seconds
+
+TOOL_OUTPUT_PREVIEW = 500       # characters of each tool output sent to the client
+
+
+def _preview(output) -> str:
+    text = output if isinstance(output, str) else str(output)
+    return text if len(text) <= TOOL_OUTPUT_PREVIEW else text[:TOOL_OUTPUT_PREVIEW] + "…"
+
+
+async def stream_run(agent, user_message: str, tools_fingerprint: str = ""):
+    """
+    Async generator of run events for `agent`:
+      {"event": "tool_call", "tool": name}
+      {"event": "tool_output", "tool": name, "output": value, "preview": text}
+      {"event": "delta", "text": chunk}
+      {"event": "final", "output": final_output, "cached": bool}
+    Closing the generator (e.g. the client went away) cancels the run.
+    """
+    ttl = agent_ttl(agent.name)
+    key = response_cache.key(agent.name, user_message, tools_fingerprint)
+    if ttl > 0:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            yield {"event": "final", "output": cached, "cached": True}
+            return
+
+    started = time.perf_counter()
+    result = Runner.run_streamed(agent, user_message, hooks=run_hooks)
+    tool_names = {}                 # call_id -> tool name
+    try:
+        async for event in result.stream_events():
+            if isinstance(event, RawResponsesStreamEvent):
+                if event.data.type == "response.output_text.delta" and event.data.delta:
+                    yield {"event": "delta", "text": event.data.delta}
+            elif isinstance(event, RunItemStreamEvent):
+                if event.name == "tool_called":
+                    name = getattr(event.item.raw_item, "name", "tool")
+                    tool_names[getattr(event.item.raw_item, "call_id", None)] = name
+                    yield {"event": "tool_call", "tool": name}
+                elif event.name == "tool_output":
+                    output = event.item.output
+                    yield {"event": "tool_output", "tool": tool_names.get(event.item.call_id, "tool"),
+                           "output": output, "preview": _preview(output)}
+    finally:
+        if not result.is_complete:
+            result.cancel()
+
+    _run_seconds.setdefault(agent.name, deque(maxlen=20)).append(time.perf_counter() - started)
+    output = result.final_output
+    if ttl > 0 and isinstance(output, str) and output:
+        await response_cache.put(key, agent.name, ttl, output)
+    yield {"event": "final", "output": output, "cached": False}
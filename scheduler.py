@@ -1,38 +1,69 @@
+import os
+import time
+import inspect
 import asyncio
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from datetime import datetime
 import logging
 
 # === Import agent run functions ===
-from myagents.atlasfx_agent import run_agent as run_atlasfx
-from myagents.cryptonova_agent import run_agent as run_cryptonova
-from myagents.janemacro_agent import run_agent as run_janemacro
-from myagents.maxmentor_agent import run_agent as run_maxmentor
-from myagents.quantedge_agent import run_agent as run_quantedge
+from myagents.atlasfx_agent import run_agent as run_atlasfx, run_direct as direct_atlasfx
+from myagents.cryptonova_agent import run_agent as run_cryptonova, run_direct as direct_cryptonova
+from myagents.janemacro_agent import run_agent as run_janemacro, run_direct as direct_janemacro
+from myagents.maxmentor_agent import run_agent as run_maxmentor, run_direct as direct_maxmentor
+from myagents.quantedge_agent import run_agent as run_quantedge, run_direct as direct_quantedge
+from myagents.orchestrator import run_agents_concurrently
+from myagents.agent_output import parse_agent_output
+from myagents.artifacts import capture_tool_outputs
+from myagents.snapshots import prerender_charts, publish_snapshot
+from myagents.chart_service import shutdown_pool
+from myagents.chart_store import chart_store, CHART_GC_INTERVAL
+from db.batch_writer import chat_log_writer, log_chat
+from db.quote_store import quote_writer
 
 
 
+# === Config (overridable from .env) ===
+SCHEDULER_MODE = os.getenv("SCHEDULER_MODE", "direct")      # "direct" (one LLM call per agent) or "agentic"
+
 # === Setup Logging ===
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
 
+AGENTS = {
+    "AtlasFX": {"agentic": run_atlasfx, "direct": direct_atlasfx},
+    "CryptoNova": {"agentic": run_cryptonova, "direct": direct_cryptonova},
+    "JaneMacro": {"agentic": run_janemacro, "direct": direct_janemacro},
+    "MaxMentor": {"agentic": run_maxmentor, "direct": direct_maxmentor},
+    "QuantEdge": {"agentic": run_quantedge, "direct": direct_quantedge},
+}
+
+# === Run one agent on its standing prompt and publish the result for GET /latest/{agent} ===
+def snapshot_job(name: str, run):
+    async def job():
+        message = inspect.signature(run).parameters["user_message"].default
+        started = time.perf_counter()
+        with capture_tool_outputs() as tool_outputs:
+            text = await run(message)
+        result = await parse_agent_output(text)
+        rendered = await prerender_charts(result["chart_urls"])
+        snapshot = publish_snapshot(name, message, result, tool_outputs, round(time.perf_counter() - started, 3))
+        logging.info(f"📸 {name} snapshot published ({len(snapshot['chart_urls'])} charts, {rendered} rendered)")
+        return text
+    return job
+
 # === Run all agents ===
 async def run_all_agents():
     logging.info("🚀 Running all agents...")
-    agents = [
-        ("AtlasFX", run_atlasfx),
-        ("CryptoNova", run_cryptonova),
-        ("JaneMacro", run_janemacro),
-        ("MaxMentor", run_maxmentor),
-        ("QuantEdge", run_quantedge)
-    ]
-
-    for name, func in agents:
-        try:
-            logging.info(f"🔁 Running agent: {name}")
-            output = await func()
-            logging.info(f"✅ {name} Output:\n{output}\n")
-        except Exception as e:
-            logging.error(f"❌ Error in {name}: {e}")
+    agents = [(name, snapshot_job(name, modes[SCHEDULER_MODE])) for name, modes in AGENTS.items()]
+
+    # A failed agent keeps its previous snapshot
+    outcomes = await run_agents_concurrently(agents)
+    for name, outcome in outcomes.items():
+        if outcome["status"] == "ok":
+            logging.info(f"✅ {name} Output ({outcome['elapsed']}s):\n{outcome['result']}\n")
+            log_chat(f"[{name}] {outcome['result']}", agent=name)
+        else:
+            logging.error(f"❌ {name} {outcome['status']} after {outcome['elapsed']}s: {outcome['error']}")
 
 # === Main Runner ===
 async def main():
@@ -44,14 +75,24 @@ async def main():
     # Then repeat every 6 hours
     scheduler.add_job(run_all_agents, trigger='interval', hours=6, next_run_time=datetime.now())
 
+    # Keep myagents/charts/ within its size and age limits
+    scheduler.add_job(chart_store.collect, trigger='interval', seconds=CHART_GC_INTERVAL, next_run_time=datetime.now())
+
+    chat_log_writer.start()
+    quote_writer.start()
     scheduler.start()
     logging.info("🗓 Scheduler started. Runs all agents every 6 hours, first run immediately.")
 
     try:
         while True:
             await asyncio.sleep(3600)  # keep alive
-    except (KeyboardInterrupt, SystemExit):
+    except (KeyboardInterrupt, SystemExit, asyncio.CancelledError):
         logging.info("🛑 Scheduler stopped.")
+    finally:
+        scheduler.shutdown(wait=False)
+        await chat_log_writer.stop()
+        await quote_writer.stop()
+        shutdown_pool()
 
 if __name__ == "__main__":
     asyncio.run(main())